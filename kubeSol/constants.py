@@ -72,6 +72,7 @@ GITHUB_REPO_PREFIX = "kubesol-project-"                        # Prefijo para lo
 GITHUB_DEFAULT_BRANCH_NAME = "main"                    # Rama por defecto al crear un nuevo repo (suele ser 'main' o 'master')
 GITHUB_DEV_BRANCH_NAME = "develop"                     # Rama específica para el entorno 'dev'
 GITHUB_SCRIPTS_FOLDER = "scripts"                      # Carpeta donde se guardarán los scripts en el repo
+GITHUB_API_MAX_RETRIES = 5                             # Reintentos (con backoff) ante rate limits y errores 5xx de GitHub
 
 # Labels adicionales para los namespaces de KubeSol para almacenar información de GitHub
 PROJECT_REPO_NAME_LABEL_KEY = "kubesol.io/github-repo-name" # Nombre del repositorio de GitHub
@@ -1,9 +1,12 @@
 # kubeSol/engine/executor.py
-from kubeSol.parser.parser import parse_sql
+from kubeSol.parser.parser import CommandParseError, parse_many, parse_sql
 from kubeSol.engine import k8s_api
 from kubeSol.engine import script_runner
-import os
 import base64 
+from pathlib import Path
+from types import MappingProxyType
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from kubeSol.constants import (
     ACTION_CREATE, ACTION_DELETE, ACTION_UPDATE, ACTION_GET, ACTION_LIST, ACTION_EXECUTE,
     RESOURCE_SECRET, RESOURCE_CONFIGMAP, RESOURCE_PARAMETER, RESOURCE_SCRIPT,
@@ -17,12 +20,14 @@ from kubeSol.constants import (
     LOGICAL_TYPE_PROJECT, LOGICAL_TYPE_ENVIRONMENT
 )
 from kubernetes.client.exceptions import ApiException as K8sApiException
-from tabulate import tabulate
 
 # --- NUEVAS IMPORTACIONES ---
 from kubeSol.projects import cli_handlers as project_cli_handlers
+from kubeSol.projects.cli_handlers import grid_table # tabulate se importa de forma diferida ahí
 from kubeSol.projects.context import KubeSolContext 
 
+logger = logging.getLogger(__name__)
+
 
 # --- Handlers Existentes para Recursos (_handle_create_secret, _handle_create_script, etc.) ---
 # (Asegúrate de que todas estas funciones estén completas y correctas aquí, como en tu última versión funcional)
@@ -40,9 +45,7 @@ def _handle_create_secret(name: str, fields: dict, namespace: str):
                 continue
             local_file_path = value
             try:
-                with open(local_file_path, 'rb') as f_stream: 
-                    file_content_bytes = f_stream.read()
-                b64_data_payload[actual_key_in_secret] = base64.b64encode(file_content_bytes).decode('utf-8')
+                b64_data_payload[actual_key_in_secret] = base64.b64encode(Path(local_file_path).read_bytes()).decode('utf-8')
             except FileNotFoundError: raise ValueError(f"File not found for secret key '{actual_key_in_secret}': {local_file_path}")
             except Exception as e: raise ValueError(f"Error reading file for secret key '{actual_key_in_secret}': {e}")
         else: string_data_payload[key] = value
@@ -67,15 +70,13 @@ def _handle_update_parameter(name, fields, namespace):
     k8s_api.update_parameter(name=name, script_content=content, namespace=namespace)
 def _handle_update_configmap(name, fields, namespace): k8s_api.update_configmap(name=name, data=fields, namespace=namespace)
 def _handle_create_script(name: str, details: dict, namespace: str):
-    final_script_details_for_cm = details.copy() 
+    final_script_details_for_cm = details # El dict lo crea el transformer para este comando; se modifica en sitio
     code_inline = final_script_details_for_cm.get(SCRIPT_CM_KEY_CODE)
     code_from_file_path = final_script_details_for_cm.pop(SCRIPT_CM_KEY_CODE_FROM_FILE, None)
     if code_inline and code_from_file_path: raise ValueError(f"Cannot specify '{SCRIPT_CM_KEY_CODE}' and '{SCRIPT_CM_KEY_CODE_FROM_FILE}' for script '{name}'.")
     if code_from_file_path:
         try:
-            abs_file_path = os.path.abspath(code_from_file_path)
-            with open(abs_file_path, 'r', encoding='utf-8') as f: actual_script_code = f.read()
-            final_script_details_for_cm[SCRIPT_CM_KEY_CODE] = actual_script_code
+            final_script_details_for_cm[SCRIPT_CM_KEY_CODE] = Path(code_from_file_path).read_text(encoding='utf-8')
         except Exception as e: raise ValueError(f"Error reading script file '{code_from_file_path}': {e}")
     elif not code_inline: raise ValueError(f"Either '{SCRIPT_CM_KEY_CODE}' or '{SCRIPT_CM_KEY_CODE_FROM_FILE}' must be specified for script '{name}'.")
     if final_script_details_for_cm.get(SCRIPT_CM_KEY_CODE) is None: raise ValueError(f"Script code missing for '{name}'.")
@@ -88,24 +89,28 @@ def _handle_get_script(name: str, namespace: str):
     data = k8s_api.get_script_configmap_data(script_name=name, namespace=namespace)
     if not data: return
     cm_name = data.get('_cm_name', k8s_api.get_script_cm_name(name))
-    print(f"📄 Script Details for '{name}' (from ConfigMap: '{cm_name}')")
+    output = [f"📄 Script Details for '{name}' (from ConfigMap: '{cm_name}')"] # Se emite con un solo print
     meta, code_val = [], None # Renamed code to code_val to avoid conflict
     for k,v in sorted(data.items()):
         if k == SCRIPT_CM_KEY_CODE: code_val = v
         elif k.startswith('_'): continue
-        else: meta.append([k, str(v)[:70] + ('...' if len(str(v)) > 70 else '')])
-    if meta: print(tabulate(meta, headers=["Attribute", "Value"], tablefmt="grid"))
-    if code_val is not None: print(f"\n🖥️ Code ({SCRIPT_CM_KEY_CODE}):\n--- BEGIN CODE ---\n{code_val}\n--- END CODE ---")
+        else:
+            value_text = str(v)
+            meta.append([k, value_text[:70] + '...' if len(value_text) > 70 else value_text])
+    if meta: output.append(grid_table(meta, ["Attribute", "Value"]))
+    if code_val is not None: output.append(f"\n🖥️ Code ({SCRIPT_CM_KEY_CODE}):\n--- BEGIN CODE ---\n{code_val}\n--- END CODE ---")
+    print("\n".join(output))
+
+def _short_description(description: str) -> str:
+    return description[:47] + '...' if len(description) > 50 else description
 
 def _handle_list_scripts(namespace: str):
     scripts = k8s_api.list_script_configmaps_data(namespace=namespace)
     if not scripts: print(f"ℹ️ No scripts found in '{namespace}'."); return
-    print(f"📜 Scripts in namespace '{namespace}':")
     headers = ["Name", "Type", "Engine", "Description", "ConfigMap Name"]
     data = [[s.get('_script_name_from_cm','N/A'), s.get(SCRIPT_CM_KEY_TYPE,'N/A'), s.get(SCRIPT_CM_KEY_ENGINE,'N/A'), 
-             (s.get(SCRIPT_CM_KEY_DESCRIPTION,'')[:47] + '...' if len(s.get(SCRIPT_CM_KEY_DESCRIPTION,'')) > 50 else s.get(SCRIPT_CM_KEY_DESCRIPTION,'')), 
-             s.get('_cm_name','N/A')] for s in scripts]
-    if data: print(tabulate(data, headers=headers, tablefmt="grid"))
+             _short_description(s.get(SCRIPT_CM_KEY_DESCRIPTION,'')), s.get('_cm_name','N/A')] for s in scripts]
+    print(f"📜 Scripts in namespace '{namespace}':\n{grid_table(data, headers)}")
 
 def _handle_delete_script(name: str, namespace: str): k8s_api.delete_script_configmap(script_name=name, namespace=namespace)
 def _handle_update_script(name: str, updates_dict: dict, namespace: str): 
@@ -113,24 +118,33 @@ def _handle_update_script(name: str, updates_dict: dict, namespace: str):
     k8s_api.update_script_configmap(script_name=name, updates=updates_dict, namespace=namespace)
 
 def _resolve_parameters_from_configmap(cm_name, prefix, ns):
-    # Awaiting full implementation of k8s_api.get_configmap_data or using direct client call
-    print(f"DEBUG: _resolve_parameters_from_configmap called for {cm_name} (not fully implemented in example).")
-    return {} # Placeholder
+    """Parámetros leídos de una ConfigMap: con prefijo, solo las claves que lo llevan (sin el prefijo)."""
+    cm_data = k8s_api.get_configmap_data(name=cm_name, namespace=ns)
+    if not cm_data: return {}
+    if not prefix: return dict(cm_data)
+    prefix_len = len(prefix)
+    return {key[prefix_len:]: value for key, value in cm_data.items() if key.startswith(prefix) and len(key) > prefix_len}
 
 def _handle_execute_script(script_name_to_exec: str, parsed_instruction_details: dict, namespace: str):
     custom_args = parsed_instruction_details.get("custom_args")
     args_from_cm = parsed_instruction_details.get("args_from_configmap")
     secret_mounts = parsed_instruction_details.get("secret_mounts", [])
-    cm_data = k8s_api.get_script_configmap_data(script_name_to_exec, namespace)
+    if args_from_cm and "cm_name" in args_from_cm:
+        # La ConfigMap de parámetros se lee en paralelo con la del script para ahorrar un viaje al apiserver
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            cm_params_future = pool.submit(_resolve_parameters_from_configmap, args_from_cm["cm_name"], args_from_cm.get("key_prefix",""), namespace)
+            cm_data = k8s_api.get_script_configmap_data(script_name_to_exec, namespace)
+            params = cm_params_future.result()
+    else:
+        cm_data = k8s_api.get_script_configmap_data(script_name_to_exec, namespace)
+        params = {}
     if not cm_data: print(f"❌ Script '{script_name_to_exec}' not found."); return
-    params = {}
-    if args_from_cm and "cm_name" in args_from_cm: 
-        params.update(_resolve_parameters_from_configmap(args_from_cm["cm_name"], args_from_cm.get("key_prefix",""), namespace))
     if custom_args: params.update(custom_args)
     engine = cm_data.get(SCRIPT_CM_KEY_ENGINE, SCRIPT_ENGINE_K8S_JOB)
-    print(f"ℹ️ Script '{script_name_to_exec}' using engine: '{engine}'.")
-    if params: print(f"   With resolved parameters: {list(params.keys())}")
-    if secret_mounts: print(f"   With {len(secret_mounts)} secret mount(s) requested.")
+    summary = [f"ℹ️ Script '{script_name_to_exec}' using engine: '{engine}'."]
+    if params: summary.append(f"   With resolved parameters: {list(params.keys())}")
+    if secret_mounts: summary.append(f"   With {len(secret_mounts)} secret mount(s) requested.")
+    print("\n".join(summary))
     if engine == SCRIPT_ENGINE_K8S_JOB:
         script_runner.run_script_as_k8s_job(script_name_to_exec, cm_data, params, namespace, secret_mounts)
     elif engine == SCRIPT_ENGINE_SPARK_OPERATOR: 
@@ -139,7 +153,8 @@ def _handle_execute_script(script_name_to_exec: str, parsed_instruction_details:
         print(f"❌ Execution engine '{engine}' is not supported for script '{script_name_to_exec}'.")
 
 # --- Diccionario COMMAND_HANDLERS Actualizado ---
-COMMAND_HANDLERS = {
+# Vista de solo lectura: se comparte entre el shell, el kernel y los lotes sin riesgo de modificarla
+COMMAND_HANDLERS = MappingProxyType({
     # Comandos de recursos existentes
     (ACTION_CREATE, RESOURCE_SECRET): _handle_create_secret,
     (ACTION_CREATE, RESOURCE_PARAMETER): _handle_create_parameter,
@@ -169,10 +184,11 @@ COMMAND_HANDLERS = {
     (ACTION_DROP_PROJECT, LOGICAL_TYPE_PROJECT): project_cli_handlers.handle_drop_project,
     (ACTION_DROP_ENV, LOGICAL_TYPE_ENVIRONMENT): project_cli_handlers.handle_drop_environment,
     (ACTION_USE_PROJECT_ENV, LOGICAL_TYPE_PROJECT): project_cli_handlers.handle_use_project_environment,
+})
 
-    (ACTION_CREATE_PROJECT, LOGICAL_TYPE_PROJECT): project_cli_handlers.handle_create_project,
-    (ACTION_CREATE_ENV, LOGICAL_TYPE_ENVIRONMENT): project_cli_handlers.handle_create_environment, # No cambia el target_handler_func
-}
+# Tipos precalculados para que el despacho use pertenencia O(1) en lugar de recorrer listas
+_KEY_VALUE_RESOURCE_TYPES = frozenset((RESOURCE_SECRET, RESOURCE_CONFIGMAP, RESOURCE_PARAMETER))
+_PROJECT_LOGICAL_TYPES = frozenset((LOGICAL_TYPE_PROJECT, LOGICAL_TYPE_ENVIRONMENT))
 
 # execute_command ahora acepta KubeSolContext
 def execute_command(command_string: str, context: KubeSolContext):
@@ -183,12 +199,44 @@ def execute_command(command_string: str, context: KubeSolContext):
         parsed_instruction = parse_sql(command_string)
         print(f"🧾 Parsed: {parsed_instruction}")
     except Exception as e:
-        print(f"❌ Error parsing command.")
-        print(f"   Type: {type(e)}, Details: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"❌ Error parsing command.\n   Type: {type(e)}, Details: {e}")
+        logger.debug("Parser traceback for command %r", command_string, exc_info=True)
         return
+    _dispatch_parsed_command(parsed_instruction, context)
+
+def _is_batchable_create(parsed_instruction: dict) -> bool:
+    """CREATE de recursos clave/valor: independientes entre sí y sin efecto sobre el contexto."""
+    return (parsed_instruction.get("action") == ACTION_CREATE
+            and parsed_instruction.get("type") in _KEY_VALUE_RESOURCE_TYPES)
+
+def execute_commands(command_strings: list[str], context: KubeSolContext):
+    """
+    Parsea y ejecuta varios comandos en orden. Las secuencias consecutivas de
+    CREATE SECRET/CONFIGMAP/PARAMETER se envían al apiserver en paralelo.
+    """
+    try:
+        parsed_instructions = parse_many(command_strings)
+    except CommandParseError as e:
+        print(f"❌ Error parsing command: {e.command.strip()}\n   Type: {type(e.error)}, Details: {e.error}\nℹ️ No commands were executed.")
+        return
+
+    index, total = 0, len(parsed_instructions)
+    while index < total:
+        run_end = index
+        while run_end < total and _is_batchable_create(parsed_instructions[run_end]):
+            run_end += 1
+        if run_end - index > 1:
+            # Estos comandos no modifican el contexto, así que los hilos pueden compartirlo.
+            # El pool compartido de k8s_api acota las peticiones simultáneas al apiserver.
+            list(k8s_api.get_bulk_executor().map(lambda instr: _dispatch_parsed_command(instr, context),
+                                                 parsed_instructions[index:run_end]))
+            index = run_end
+        else:
+            _dispatch_parsed_command(parsed_instructions[index], context)
+            index += 1
 
+def _dispatch_parsed_command(parsed_instruction: dict, context: KubeSolContext):
+    """Despacha una instrucción ya parseada a su handler."""
     action_type = parsed_instruction.get("action")
     command_object_type = parsed_instruction.get("type")
 
@@ -202,7 +250,7 @@ def execute_command(command_string: str, context: KubeSolContext):
     current_k8s_namespace = context.current_namespace
 
     try:
-        if command_object_type in [LOGICAL_TYPE_PROJECT, LOGICAL_TYPE_ENVIRONMENT] or \
+        if command_object_type in _PROJECT_LOGICAL_TYPES or \
            action_type == ACTION_USE_PROJECT_ENV:
             # Los handlers de proyecto/entorno esperan (parsed_args_dict, context_obj)
             target_handler_func(parsed_args=parsed_instruction, context=context)
@@ -228,14 +276,14 @@ def execute_command(command_string: str, context: KubeSolContext):
                 if command_object_type == RESOURCE_SCRIPT:
                     updates_data = parsed_instruction.get("updates")
                     if updates_data is None: raise ValueError("'updates' required for UPDATE SCRIPT.")
-                    target_handler_func(name=resource_identifier, updates=updates_data, namespace=current_k8s_namespace)
+                    target_handler_func(name=resource_identifier, updates_dict=updates_data, namespace=current_k8s_namespace)
                 else:
                     fields_data = parsed_instruction.get("fields")
                     if fields_data is None: raise ValueError(f"Fields required for UPDATE {command_object_type}.")
                     target_handler_func(name=resource_identifier, fields=fields_data, namespace=current_k8s_namespace)
             elif action_type == ACTION_GET or action_type == ACTION_DELETE:
                 if resource_identifier is None: raise ValueError(f"Resource name required for {action_type} {command_object_type}.")
-                if action_type == ACTION_DELETE and command_object_type in [RESOURCE_SECRET, RESOURCE_CONFIGMAP, RESOURCE_PARAMETER]:
+                if action_type == ACTION_DELETE and command_object_type in _KEY_VALUE_RESOURCE_TYPES:
                      target_handler_func(name=resource_identifier, resource_type=command_object_type, namespace=current_k8s_namespace)
                 else:
                      target_handler_func(name=resource_identifier, namespace=current_k8s_namespace)
@@ -249,6 +297,5 @@ def execute_command(command_string: str, context: KubeSolContext):
     except K8sApiException as kube_api_error:
         k8s_api._print_api_exception_details(kube_api_error, f"K8s API error during '{action_type} {command_object_type}' operation for '{parsed_instruction.get('name', '')}'")
     except Exception as e:
-        print(f"❌ Unexpected error executing command '{action_type} {command_object_type}': {type(e).__name__} - {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Unexpected error executing command '%s %s': %s - %s",
+                         action_type, command_object_type, type(e).__name__, e)
@@ -12,10 +12,40 @@ import re
 import traceback
 import base64 
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Pool de hilos compartido para las operaciones en lote; se crea en el primer uso y se reutiliza.
+# Su tamaño acota también las peticiones simultáneas al API server (evita respuestas 429).
+_BULK_MAX_WORKERS = 8
+_bulk_executor: ThreadPoolExecutor | None = None
+_bulk_executor_lock = threading.Lock()
+
+def get_bulk_executor() -> ThreadPoolExecutor:
+    """Shared pool for fan-out API calls (also used by the executor for batched commands)."""
+    global _bulk_executor
+    with _bulk_executor_lock:
+        if _bulk_executor is None:
+            _bulk_executor = ThreadPoolExecutor(max_workers=_BULK_MAX_WORKERS, thread_name_prefix="kubesol-k8s")
+    return _bulk_executor
+
+# Reintentos de urllib3 ante errores de conexión (p. ej. una conexión keep-alive cerrada por el server)
+_HTTP_RETRIES = 3
+
+def _new_core_v1_api() -> client.CoreV1Api:
+    """
+    CoreV1Api sobre un único ApiClient del proceso: todas las llamadas reutilizan sus conexiones
+    keep-alive (un solo handshake TLS por conexión) y el pool alcanza para el pool de hilos en lote.
+    """
+    configuration = client.Configuration()
+    config.load_kube_config(client_configuration=configuration)
+    configuration.connection_pool_maxsize = max(configuration.connection_pool_maxsize or 0, _BULK_MAX_WORKERS)
+    configuration.retries = _HTTP_RETRIES
+    return client.CoreV1Api(client.ApiClient(configuration))
 
 try:
-    config.load_kube_config()
-    core_v1_api = client.CoreV1Api()
+    core_v1_api = _new_core_v1_api()
 except config.ConfigException as e:
     print(f"🚨 Critical Error: Could not load Kubernetes configuration: {e}\n   Please ensure your kubeconfig is correctly set up.")
     core_v1_api = None 
@@ -27,29 +57,38 @@ def get_api_client() -> client.CoreV1Api:
     global core_v1_api
     if core_v1_api is None:
         try:
-            config.load_kube_config()
-            core_v1_api = client.CoreV1Api()
+            core_v1_api = _new_core_v1_api()
         except Exception as e_conf:
             raise RuntimeError(f"Could not initialize Kubernetes API client in get_api_client: {e_conf}")
     if core_v1_api is None:
          raise RuntimeError("core_v1_api is None even after re-initialization attempt.")
     return core_v1_api
 
+_batch_v1_api: client.BatchV1Api | None = None
+
+def get_batch_api_client() -> client.BatchV1Api:
+    """BatchV1Api que comparte el ApiClient (y su pool de conexiones) de get_api_client()."""
+    global _batch_v1_api
+    if _batch_v1_api is None:
+        _batch_v1_api = client.BatchV1Api(get_api_client().api_client)
+    return _batch_v1_api
+
 def _print_api_exception_details(e: ApiException, context_message: str):
-    base_error_message = f"❌ {context_message}: {e.reason} (Status: {e.status})"
-    print(base_error_message)
+    # Se arma el mensaje completo y se emite con un solo print para que no se intercale entre hilos
+    report_lines = [f"❌ {context_message}: {e.reason} (Status: {e.status})"]
     if e.body:
         try:
             error_body_json = json.loads(e.body)
-            print(f"   K8S API Message: {error_body_json.get('message', 'N/A')}")
+            report_lines.append(f"   K8S API Message: {error_body_json.get('message', 'N/A')}")
             if error_body_json.get('details') and error_body_json['details'].get('causes'):
-                print("  Causes:")
+                report_lines.append("  Causes:")
                 for cause in error_body_json['details']['causes']:
-                    print(f"    - Field: {cause.get('field', 'N/A')}, Reason: {cause.get('reason', 'N/A')}, Message: {cause.get('message', 'N/A')}")
+                    report_lines.append(f"    - Field: {cause.get('field', 'N/A')}, Reason: {cause.get('reason', 'N/A')}, Message: {cause.get('message', 'N/A')}")
         except json.JSONDecodeError:
-            print(f"  K8S API Error Body (not valid JSON or empty): {e.body[:500]}...") 
+            report_lines.append(f"  K8S API Error Body (not valid JSON or empty): {e.body[:500]}...")
     else:
-        print("  K8S API Error Body: No additional content from API.")
+        report_lines.append("  K8S API Error Body: No additional content from API.")
+    print("\n".join(report_lines))
 
 
 def _sanitize_for_k8s_name(input_name: str) -> str: 
@@ -127,11 +166,12 @@ def create_secret_with_mixed_data(name: str,
     )
     try:
         api.create_namespaced_secret(namespace=namespace, body=secret_body)
-        print(f"✅ Secret '{name}' created successfully in namespace '{namespace}'.")
+        report_lines = [f"✅ Secret '{name}' created successfully in namespace '{namespace}'."]
         if string_data_payload:
-            print(f"   Includes string data keys: {list(string_data_payload.keys())}")
+            report_lines.append(f"   Includes string data keys: {list(string_data_payload.keys())}")
         if b64_data_payload:
-            print(f"   Includes file-based/encoded data keys: {list(b64_data_payload.keys())}")
+            report_lines.append(f"   Includes file-based/encoded data keys: {list(b64_data_payload.keys())}")
+        print("\n".join(report_lines))
     except ApiException as e:
         _print_api_exception_details(e, f"Error creating Secret '{name}' with mixed data in namespace '{namespace}'")
 
@@ -174,6 +214,19 @@ def update_parameter(name: str, script_content: str, namespace: str = DEFAULT_NA
     update_secret(name=name, data={"script": script_content}, namespace=namespace)
 
 # --- CONFIGMAPS ---
+def get_configmap_data(name: str, namespace: str = DEFAULT_NAMESPACE) -> dict | None:
+    """Retrieves the data section of a ConfigMap."""
+    api = get_api_client()
+    try:
+        configmap_resource = api.read_namespaced_config_map(name=name, namespace=namespace)
+        return configmap_resource.data or {}
+    except ApiException as e:
+        if e.status == 404:
+            print(f"🤷 ConfigMap '{name}' not found in namespace '{namespace}'.")
+        else:
+            _print_api_exception_details(e, f"Error getting ConfigMap '{name}' in namespace '{namespace}'")
+        return None
+
 def create_configmap(name: str, data: dict, namespace: str = DEFAULT_NAMESPACE): 
     api = get_api_client()
     metadata = client.V1ObjectMeta(name=name, namespace=namespace)
@@ -296,7 +349,7 @@ def list_script_configmaps_data(namespace: str = DEFAULT_NAMESPACE) -> list[dict
         configmaps_response = api.list_namespaced_config_map(namespace=namespace, label_selector=label_selector) 
         for cm_item in configmaps_response.items: 
             if cm_item.data: 
-                script_info = cm_item.data.copy() 
+                script_info = cm_item.data # freshly deserialized per response; no need to copy
                 script_info['_script_name_from_cm'] = cm_item.metadata.name.replace(SCRIPT_CM_PREFIX, "", 1) 
                 script_info['_cm_name'] = cm_item.metadata.name 
                 scripts_data_list.append(script_info)
@@ -366,8 +419,7 @@ def create_k8s_job(job_name: str, namespace: str, image: str,
     """
     Creates a Kubernetes Job with PodFailurePolicy and controlled retries.
     """
-    core_api = get_api_client() 
-    batch_v1_api = client.BatchV1Api(core_api.api_client) 
+    batch_v1_api = get_batch_api_client()
 
     all_volumes = []
     all_container_volume_mounts = []
@@ -474,8 +526,7 @@ def create_k8s_job(job_name: str, namespace: str, image: str,
         else:
             print(f"  spec.podFailurePolicy: Not set or no rules.")
 
-        current_batch_v1_api = client.BatchV1Api(get_api_client().api_client)
-        current_batch_v1_api.create_namespaced_job(body=job_object, namespace=namespace)
+        batch_v1_api.create_namespaced_job(body=job_object, namespace=namespace)
         
         print(f"✅ Job '{job_name}' created in namespace '{namespace}'.")
         return True
@@ -498,9 +549,7 @@ def get_k8s_job_status(job_name: str, namespace: str = DEFAULT_NAMESPACE) -> dic
         A dictionary with job status details (active, succeeded, failed counts, etc.)
         or None if the job is not found or an error occurs.
     """
-    # Asegúrate que get_api_client() esté disponible y devuelva CoreV1Api
-    api_client_instance = get_api_client() 
-    batch_v1_api = client.BatchV1Api(api_client_instance.api_client) 
+    batch_v1_api = get_batch_api_client()
     
     try:
         job_status_obj = batch_v1_api.read_namespaced_job_status(name=job_name, namespace=namespace)
@@ -537,7 +586,6 @@ def get_k8s_job_status(job_name: str, namespace: str = DEFAULT_NAMESPACE) -> dic
         return None
     except Exception as general_error:
         print(f"🔥🔥🔥 UNEXPECTED ERROR in get_k8s_job_status for '{job_name}': {type(general_error).__name__} - {general_error}")
-        import traceback
         traceback.print_exc()
         return None
 
@@ -587,7 +635,6 @@ def get_k8s_job_logs(job_name: str, namespace: str = DEFAULT_NAMESPACE, tail_lin
         return None
     except Exception as general_error:
         print(f"🔥🔥🔥 UNEXPECTED ERROR in get_k8s_job_logs for '{job_name}': {type(general_error).__name__} - {general_error}")
-        import traceback
         traceback.print_exc()
         return None
 
@@ -612,6 +659,7 @@ def create_k8s_namespace(name: str, labels: dict = None, annotations: dict = Non
     )
     try:
         api.create_namespace(body=namespace_body)
+        invalidate_namespace_list_cache()
         print(f"✅ Namespace '{name}' created successfully with labels: {labels or {}} and annotations: {annotations or {}}.")
         return True
     except ApiException as e:
@@ -625,10 +673,39 @@ def create_k8s_namespace(name: str, labels: dict = None, annotations: dict = Non
         return False
     except Exception as ex_general:
         print(f"🔥🔥🔥 UNEXPECTED ERROR in create_k8s_namespace for '{name}': {type(ex_general).__name__} - {ex_general}")
-        import traceback
         traceback.print_exc()
         return False
 
+# Caché con TTL de los listados de namespaces, por label selector. Evita repetir el mismo
+# listado varias veces dentro de un comando; las funciones que crean, borran o parchean
+# namespaces la invalidan.
+_NAMESPACE_LIST_CACHE_TTL_SECONDS = 30.0
+# Clave: (vista, label_selector, from_watch_cache, limit), con vista "full" (V1Namespace completo) o "metadata" (solo metadata)
+_namespace_list_cache: dict[tuple[str, str | None, bool, int | None], tuple[float, list]] = {}
+_namespace_list_cache_lock = threading.Lock()
+
+# Pide al API server una PartialObjectMetadataList: solo metadata, sin spec ni status
+_PARTIAL_METADATA_LIST_ACCEPT = "application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1"
+# resourceVersion="0": el API server responde desde su watch cache en vez de leer de etcd
+_WATCH_CACHE_RESOURCE_VERSION = "0"
+
+def invalidate_namespace_list_cache():
+    """Drops every cached namespace listing (call after mutating namespaces)."""
+    with _namespace_list_cache_lock:
+        _namespace_list_cache.clear()
+
+def _cached_namespace_list(cache_key: tuple[str, str | None, bool, int | None]) -> list | None:
+    """Returns a copy of a fresh cached listing, or None if absent or expired."""
+    with _namespace_list_cache_lock:
+        cached = _namespace_list_cache.get(cache_key)
+    if cached is not None and time.monotonic() - cached[0] < _NAMESPACE_LIST_CACHE_TTL_SECONDS:
+        return list(cached[1])
+    return None
+
+def _store_namespace_list(cache_key: tuple[str, str | None, bool, int | None], fetched_at: float, items: list):
+    with _namespace_list_cache_lock:
+        _namespace_list_cache[cache_key] = (fetched_at, items)
+
 def get_k8s_namespace(name: str) -> client.V1Namespace | None:
     """
     Retrieves a specific Kubernetes namespace.
@@ -651,45 +728,108 @@ def get_k8s_namespace(name: str) -> client.V1Namespace | None:
         return None
     except Exception as ex_general:
         print(f"🔥🔥🔥 UNEXPECTED ERROR in get_k8s_namespace for '{name}': {type(ex_general).__name__} - {ex_general}")
-        import traceback
         traceback.print_exc()
         return None
 
-def list_k8s_namespaces(label_selector: str = None) -> list[client.V1Namespace]:
+def list_k8s_namespaces(label_selector: str = None, from_watch_cache: bool = False,
+                        limit: int | None = None) -> list[client.V1Namespace]:
     """
     Lists Kubernetes namespaces, optionally filtering by label_selector.
     Args:
         label_selector: A label selector string (e.g., "kubesol.io/project=myproj").
+        from_watch_cache: If True, sends resourceVersion=0 so the API server answers from its
+                          watch cache instead of a quorum read on etcd. Faster, but possibly
+                          slightly stale; leave False where a concurrent change must not be missed.
+        limit: If given, the API server stops after this many items (callers that only need
+               "is there at least one" should not pay for the whole list). It is only reliable
+               on consistent reads: servers answering from the watch cache may ignore it.
     Returns:
         A list of V1Namespace objects.
     """
+    cache_key = ("full", label_selector or None, from_watch_cache, limit)
+    cached = _cached_namespace_list(cache_key)
+    if cached is not None:
+        return cached
+
     api = get_api_client()
     try:
+        fetched_at = time.monotonic()
+        list_kwargs = {"resource_version": _WATCH_CACHE_RESOURCE_VERSION} if from_watch_cache else {}
         if label_selector:
-            namespace_list = api.list_namespace(label_selector=label_selector)
-        else:
-            namespace_list = api.list_namespace()
-        return namespace_list.items
+            list_kwargs["label_selector"] = label_selector
+        if limit:
+            list_kwargs["limit"] = limit
+        namespace_list = api.list_namespace(**list_kwargs)
+        items = namespace_list.items or []
+        _store_namespace_list(cache_key, fetched_at, items)
+        return list(items)
     except ApiException as e:
         _print_api_exception_details(e, f"Error listing namespaces (selector: '{label_selector}')")
         return []
     except Exception as ex_general:
         print(f"🔥🔥🔥 UNEXPECTED ERROR in list_k8s_namespaces (selector: '{label_selector}'): {type(ex_general).__name__} - {ex_general}")
-        import traceback
         traceback.print_exc()
         return []
 
-def delete_k8s_namespace(name: str) -> bool:
+def list_namespace_metadata(label_selector: str = None, from_watch_cache: bool = False,
+                            limit: int | None = None, use_cache: bool = True) -> list[client.V1Namespace]:
+    """
+    Like list_k8s_namespaces, but asks the API server for metadata only
+    (PartialObjectMetadataList), which is much smaller to transfer and decode.
+    The returned V1Namespace objects have metadata (name, labels, annotations,
+    creation_timestamp, ...) but spec and status are None.
+    use_cache=False bypasses the TTL listing cache (neither read nor stored); together with
+    from_watch_cache=False it is a fresh, consistent read, as checks before a write need.
+    """
+    cache_key = ("metadata", label_selector or None, from_watch_cache, limit)
+    if use_cache:
+        cached = _cached_namespace_list(cache_key)
+        if cached is not None:
+            return cached
+
+    api = get_api_client()
+    try:
+        fetched_at = time.monotonic()
+        query_params = [("labelSelector", label_selector)] if label_selector else []
+        if from_watch_cache:
+            query_params.append(("resourceVersion", _WATCH_CACHE_RESOURCE_VERSION))
+        if limit:
+            query_params.append(("limit", limit))
+        namespace_list = api.api_client.call_api(
+            "/api/v1/namespaces", "GET",
+            query_params=query_params,
+            header_params={"Accept": _PARTIAL_METADATA_LIST_ACCEPT},
+            response_type="V1NamespaceList",
+            auth_settings=["BearerToken"],
+            _return_http_data_only=True,
+        )
+        items = namespace_list.items or []
+        if use_cache:
+            _store_namespace_list(cache_key, fetched_at, items)
+        return list(items)
+    except ApiException as e:
+        _print_api_exception_details(e, f"Error listing namespace metadata (selector: '{label_selector}')")
+        return []
+    except Exception as ex_general:
+        print(f"🔥🔥🔥 UNEXPECTED ERROR in list_namespace_metadata (selector: '{label_selector}'): {type(ex_general).__name__} - {ex_general}")
+        traceback.print_exc()
+        return []
+
+def delete_k8s_namespace(name: str, uid: str = None) -> bool:
     """
     Deletes a Kubernetes namespace.
     Args:
         name: The name of the namespace to delete.
+        uid: If given, the API server only deletes the namespace if its UID still matches
+             (a precondition), so a namespace recreated under the same name is never removed.
     Returns:
         True if deletion was successful or namespace was already gone, False otherwise.
     """
     api = get_api_client()
+    delete_options = client.V1DeleteOptions(preconditions=client.V1Preconditions(uid=uid)) if uid else client.V1DeleteOptions()
     try:
-        api.delete_namespace(name=name, body=client.V1DeleteOptions())
+        api.delete_namespace(name=name, body=delete_options)
+        invalidate_namespace_list_cache()
         print(f"🗑️ Namespace '{name}' deletion initiated successfully.")
         # Note: Namespace deletion is asynchronous. This call returns quickly.
         # We might want to add a wait loop here if synchronous behavior is needed,
@@ -699,11 +839,13 @@ def delete_k8s_namespace(name: str) -> bool:
         if e.status == 404: # Not Found
             print(f"🤷 Namespace '{name}' not found for deletion (perhaps already deleted).")
             return True # Consider it a success if it's already gone
+        if e.status == 409 and uid: # Precondition failed: the namespace was replaced since it was read
+            print(f"❌ Namespace '{name}' changed since it was checked (UID no longer '{uid}'). Not deleted.")
+            return False
         _print_api_exception_details(e, f"Error deleting namespace '{name}'")
         return False
     except Exception as ex_general:
         print(f"🔥🔥🔥 UNEXPECTED ERROR in delete_k8s_namespace for '{name}': {type(ex_general).__name__} - {ex_general}")
-        import traceback
         traceback.print_exc()
         return False
 
@@ -720,6 +862,26 @@ def update_k8s_namespace_labels(namespace_name: str, labels_to_set: dict) -> boo
     """
     return patch_k8s_namespace_metadata(namespace_name, labels=labels_to_set)
 
+def bulk_delete_namespaces(names: list[str]) -> list[str]:
+    """
+    Deletes several namespaces concurrently.
+    Returns:
+        The names of the namespaces whose deletion failed (empty if all succeeded).
+    """
+    results = get_bulk_executor().map(delete_k8s_namespace, names)
+    return [name for name, ok in zip(names, results) if not ok]
+
+def bulk_update_namespace_labels(items: list[tuple[str, dict]]) -> list[str]:
+    """
+    Sets labels on several namespaces concurrently (one merge-patch per namespace).
+    Args:
+        items: (namespace_name, labels_to_set) pairs.
+    Returns:
+        The names of the namespaces whose patch failed (empty if all succeeded).
+    """
+    results = get_bulk_executor().map(lambda item: update_k8s_namespace_labels(*item), items)
+    return [namespace_name for (namespace_name, _), ok in zip(items, results) if not ok]
+
 def patch_k8s_namespace_metadata(namespace_name: str, labels: dict = None, annotations: dict = None) -> bool:
     """
     Patches labels and/or annotations on a given namespace.
@@ -743,6 +905,7 @@ def patch_k8s_namespace_metadata(namespace_name: str, labels: dict = None, annot
             return True
 
         api.patch_namespace(name=namespace_name, body=patch_body)
+        invalidate_namespace_list_cache()
         print(f"✅ Metadata (labels: {labels}, annotations: {annotations}) successfully patched onto namespace '{namespace_name}'.")
         return True
     except ApiException as e:
@@ -753,6 +916,5 @@ def patch_k8s_namespace_metadata(namespace_name: str, labels: dict = None, annot
         return False
     except Exception as ex_general:
         print(f"🔥🔥🔥 UNEXPECTED ERROR in patch_k8s_namespace_metadata for '{namespace_name}': {type(ex_general).__name__} - {ex_general}")
-        import traceback
         traceback.print_exc()
         return False
\ No newline at end of file
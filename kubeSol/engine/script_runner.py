@@ -1,6 +1,8 @@
 # kubeSol/engine/script_runner.py
 import time
 import uuid
+import traceback
+from kubernetes import client
 from kubeSol.engine import k8s_api 
 from kubeSol.constants import (
     SCRIPT_TYPE_PYTHON, SCRIPT_TYPE_PYSPARK,
@@ -9,7 +11,6 @@ from kubeSol.constants import (
 
 def _prepare_env_vars_from_params(parameters: dict) -> list:
     """Converts a dictionary of parameters into a list of V1EnvVar for Kubernetes."""
-    from kubernetes import client 
     env_vars = []
     for key, value in parameters.items():
         env_vars.append(client.V1EnvVar(name=f"PARAM_{key.upper()}", value=str(value)))
@@ -23,31 +24,26 @@ def _prepare_args_from_params(parameters: dict) -> list:
         args.append(str(value))
     return args
 
+# Imagen del contenedor por tipo de script para el motor K8S_JOB (los tipos ausentes no están soportados)
+_K8S_JOB_IMAGES = {
+    SCRIPT_TYPE_PYTHON: "cloudsaur/arrow-to-gcs:latest", # antes "python:3.9-slim"
+    SCRIPT_TYPE_PYSPARK: "cloudsaur/arrow-to-gcs:latest",
+}
+
 def _determine_container_config(script_type: str, script_path_in_container: str, cli_script_name: str) -> tuple[str | None, list[str] | None]:
     """
     Determines the Docker image and container command based on the script type.
     """
-    image = None
-    container_command = None
-
-    if script_type == SCRIPT_TYPE_PYTHON:
-        #image = "python:3.9-slim"
-        image="cloudsaur/arrow-to-gcs:latest"
-        container_command = ["python", script_path_in_container]
-    elif script_type == SCRIPT_TYPE_PYSPARK:
-        image = "cloudsaur/arrow-to-gcs:latest"  
-        container_command = ["python", script_path_in_container] 
-        print(f"⚠️ Warning: For PySpark with K8S_JOB, you need a Docker image ('{image}') with PySpark and dependencies.")
-        print(f"     The script '{cli_script_name}' will be executed as a Python script within that image.")
-    else:
+    image = _K8S_JOB_IMAGES.get(script_type)
+    if image is None:
         print(f"❌ Script type '{script_type}' is not currently supported by the K8S_JOB engine.")
         return None, None
-    
-    if not image:
-        print(f"❌ Could not determine the image for script type '{script_type}'.")
-        return None, None
-        
-    return image, container_command
+
+    if script_type == SCRIPT_TYPE_PYSPARK:
+        print(f"⚠️ Warning: For PySpark with K8S_JOB, you need a Docker image ('{image}') with PySpark and dependencies.\n"
+              f"     The script '{cli_script_name}' will be executed as a Python script within that image.")
+
+    return image, ["python", script_path_in_container]
 
 def _monitor_k8s_job(job_name: str, namespace: str, timeout_seconds: int = 600, check_interval_seconds: int = 10):
     """
@@ -92,7 +88,6 @@ def _monitor_k8s_job(job_name: str, namespace: str, timeout_seconds: int = 600,
         return False # Consider what state to return here
     except Exception as e:
         print(f"❌ An error occurred during Job monitoring for '{job_name}': {e}")
-        import traceback
         traceback.print_exc()
         return False # Indicate monitoring failed
 
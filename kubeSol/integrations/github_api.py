@@ -2,9 +2,10 @@ from github import Github, UnknownObjectException, GithubException
 from github.AuthenticatedUser import AuthenticatedUser # Importar este tipo específico
 from github.Organization import Organization # Importar este tipo específico
 from github.NamedUser import NamedUser # Para referencia, pero no se usará create_repo en este
+from github.GithubRetry import GithubRetry
 import os
 import base64
-from kubeSol.constants import GITHUB_ORG_OR_USER, GITHUB_TOKEN_SECRET_NAME, PROJECT_ID_LABEL_KEY, PROJECT_NAME_LABEL_KEY
+from kubeSol.constants import GITHUB_API_MAX_RETRIES, GITHUB_ORG_OR_USER, GITHUB_TOKEN_SECRET_NAME, PROJECT_ID_LABEL_KEY, PROJECT_NAME_LABEL_KEY
 
 try:
     from kubeSol.engine import k8s_api
@@ -23,7 +24,9 @@ def _get_github_client():
                 raise ValueError(f"GitHub token not found in Secret '{GITHUB_TOKEN_SECRET_NAME}' in namespace 'argocd' or missing 'token' key.")
             
             github_token = secret_data['token']
-            _github_client = Github(github_token)
+            # GithubRetry espera hasta X-RateLimit-Reset / Retry-After en 403/429 y hace
+            # backoff exponencial en 5xx, así un rate limit no aborta create_new_project a medias.
+            _github_client = Github(github_token, retry=GithubRetry(total=GITHUB_API_MAX_RETRIES))
             
             user = _github_client.get_user()
             print(f"✅ GitHub client initialized successfully for user: {user.login}")
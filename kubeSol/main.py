@@ -1,10 +1,15 @@
 # kubeSol/main.py
+import logging
+import sys
 from kubeSol.engine.kind_manager import select_cluster 
-from kubeSol.engine.executor import execute_command # execute_command signature expects context
+from kubeSol.engine.executor import execute_command, execute_commands # both expect the context
+from kubeSol.parser import split_statements
 from kubeSol.constants import DEFAULT_NAMESPACE     # Used by KubeSolContext
 from kubeSol.projects.context import KubeSolContext # Import the context manager
 from kubeSol.notebook.cli import launch_notebook_server # For LAUNCH NOTEBOOK command
 
+_EXIT_COMMANDS = frozenset(("exit", "quit")) # Checked against every input line
+
 def shell(context: KubeSolContext): # Shell now receives the context object
     """
     Runs the KubeSol interactive shell.
@@ -31,7 +36,7 @@ def shell(context: KubeSolContext): # Shell now receives the context object
             stripped_line_input = line_input.strip()
             lower_stripped_line_input = stripped_line_input.lower()
 
-            if lower_stripped_line_input in ["exit", "quit"]:
+            if lower_stripped_line_input in _EXIT_COMMANDS:
                 if command_buffer:
                     print("⚠️ Exiting. Current unexecuted command in buffer will be lost.")
                 print("👋 Goodbye!")
@@ -70,7 +75,12 @@ def shell(context: KubeSolContext): # Shell now receives the context object
                 # Pass the context object to execute_command
                 # execute_command will then pass this context to project/env handlers,
                 # or use context.current_namespace for resource-specific handlers.
-                execute_command(command_to_execute, context=context) 
+                # Input with several statements (e.g. pasted) runs as one batch.
+                statements = split_statements(command_to_execute)
+                if len(statements) > 1:
+                    execute_commands(statements, context=context)
+                else:
+                    execute_command(command_to_execute, context=context) 
                 command_buffer = []             
             
         except KeyboardInterrupt: 
@@ -88,6 +98,8 @@ def main():
     Main entry point for KubeSol application.
     Initializes Kubernetes client, selects cluster, initializes KubeSolContext, and starts the shell.
     """
+    # Los mensajes de estado de los módulos (p. ej. projects.manager) van por logging; se muestran tal cual en stdout
+    logging.basicConfig(format="%(message)s", level=logging.INFO, stream=sys.stdout)
     try:
         from kubeSol.engine.k8s_api import core_v1_api 
         if core_v1_api is None:
@@ -2,6 +2,7 @@
 from ipykernel.kernelbase import Kernel
 import traceback
 import io
+import logging
 import sys
 
 # Assuming your project structure allows these imports
@@ -13,9 +14,9 @@ except ImportError:
 
 # These imports depend on your existing kubeSol structure
 # Ensure they are correct based on where parser and executor are.
-from kubeSol.parser import parse_sql #
-from kubeSol.engine.executor import execute_command #
-from kubeSol.constants import DEFAULT_NAMESPACE #
+from kubeSol.parser import split_statements #
+from kubeSol.engine.executor import execute_command, execute_commands #
+from kubeSol.projects.context import KubeSolContext #
 
 
 class KubeSolKernel(Kernel):
@@ -32,7 +33,7 @@ class KubeSolKernel(Kernel):
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.current_namespace = DEFAULT_NAMESPACE # Each kernel instance has its own namespace context
+        self.context = KubeSolContext() # Each kernel instance has its own project/env/namespace context
         # In a more advanced kernel, you might load/save this context or allow changing it via magics.
 
     def do_execute(self, code, silent, store_history, user_expressions, allow_stdin):
@@ -53,15 +54,25 @@ class KubeSolKernel(Kernel):
         redirected_stderr = io.StringIO()
         sys.stdout = redirected_stdout
         sys.stderr = redirected_stderr
+        # Los módulos de kubeSol informan por logging: se captura junto con los print de la celda
+        kubesol_logger = logging.getLogger("kubeSol")
+        previous_log_level = kubesol_logger.level
+        log_handler = logging.StreamHandler(redirected_stdout)
+        log_handler.setFormatter(logging.Formatter("%(message)s"))
+        kubesol_logger.addHandler(log_handler)
+        kubesol_logger.setLevel(logging.INFO)
 
         error_content = None
         execution_status = 'ok'
 
         try:
-            # The execute_command function from executor.py currently prints output
-            # and handles its own parsing via parse_sql.
-            # We pass the raw code string and the kernel's current namespace.
-            execute_command(code, namespace=self.current_namespace)
+            # The executor prints its output and handles its own parsing.
+            # A cell may hold several statements: they run as one batch.
+            statements = split_statements(code)
+            if len(statements) > 1:
+                execute_commands(statements, context=self.context)
+            else:
+                execute_command(code, context=self.context)
             # If execute_command were refactored to return data, we would handle it here
             # for rich display (e.g., HTML tables for LIST commands).
 
@@ -78,6 +89,8 @@ class KubeSolKernel(Kernel):
             # Also print to our captured stderr for completeness
             print(traceback.format_exc(), file=sys.stderr)
         finally:
+            kubesol_logger.removeHandler(log_handler)
+            kubesol_logger.setLevel(previous_log_level)
             # Restore stdout and stderr
             sys.stdout = old_stdout
             sys.stderr = old_stderr
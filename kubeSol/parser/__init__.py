@@ -1,4 +1,4 @@
 # kubeSol/parser/__init__.py
-from .parser import parse_sql
+from .parser import CommandParseError, parse_many, parse_sql, split_statements
 
-__all__ = ['parse_sql']
\ No newline at end of file
+__all__ = ['CommandParseError', 'parse_many', 'parse_sql', 'split_statements']
\ No newline at end of file
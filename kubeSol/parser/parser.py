@@ -1,4 +1,8 @@
 # kubeSol/parser/parser.py
+import hashlib
+import os
+import sys
+import lark
 from lark import Lark
 from kubeSol.parser.transformer import KubeTransformer
 
@@ -24,46 +28,46 @@ sql_grammar = r"""
            | use_project_env_command
 
     // --- Palabras Clave Principales (Terminals) ---
-    // (Keep all your keyword terminals as previously defined and corrected)
-    CREATE_KW: "CREATE"i
-    DELETE_KW: "DELETE"i
-    UPDATE_KW: "UPDATE"i
-    GET_KW: "GET"i
-    LIST_KW: "LIST"i
-    EXECUTE_KW: "EXECUTE"i
-    USE_KW: "USE"i 
-    DROP_KW: "DROP"i 
-
-    SECRET_KW: "SECRET"i 
-    CONFIGMAP_KW: "CONFIGMAP"i
-    PARAMETER_KW: "PARAMETER"i 
-    SCRIPT_KW: "SCRIPT"i 
-    PROJECT_KW: "PROJECT"i
-    ENV_KW: "ENV"i | "ENVIRONMENT"i
+    // Prioridad 2 para que las palabras clave ganen sobre NAME (prioridad por defecto) cuando ambas coinciden
+    CREATE_KW.2: "CREATE"i
+    DELETE_KW.2: "DELETE"i
+    UPDATE_KW.2: "UPDATE"i
+    GET_KW.2: "GET"i
+    LIST_KW.2: "LIST"i
+    EXECUTE_KW.2: "EXECUTE"i
+    USE_KW.2: "USE"i 
+    DROP_KW.2: "DROP"i 
+
+    SECRET_KW.2: "SECRET"i 
+    CONFIGMAP_KW.2: "CONFIGMAP"i
+    PARAMETER_KW.2: "PARAMETER"i 
+    SCRIPT_KW.2: "SCRIPT"i 
+    PROJECT_KW.2: "PROJECT"i
+    ENV_KW.2: "ENV"i | "ENVIRONMENT"i
     
-    WITH_KW: "WITH"i
-    ARGS_KW: "ARGS"i
-    PARAMS_FROM_CONFIGMAP_KW: "PARAMS_FROM_CONFIGMAP"i
-    KEY_KW: "KEY"i
-    AS_KW: "AS"i
-    TYPE_KW: "TYPE"i
-    ENGINE_KW: "ENGINE"i
-    SET_KW: "SET"i
-    FOR_KW: "FOR"i      
-    FROM_KW: "FROM"i    
-    THIS_KW: "THIS"i
-    TO_KW: "TO"i
-    KEY_PREFIX_KW: "KEY_PREFIX"i
-    DEPENDING_KW: "DEPENDING"i 
-
-    PYTHON_KW: "PYTHON"i
-    PYSPARK_KW: "PYSPARK"i
-    SQL_SPARK_KW: "SQL_SPARK"i
-    K8S_JOB_KW: "K8S_JOB"i
-    SPARK_OPERATOR_KW: "SPARK_OPERATOR"i
+    WITH_KW.2: "WITH"i
+    ARGS_KW.2: "ARGS"i
+    PARAMS_FROM_CONFIGMAP_KW.2: "PARAMS_FROM_CONFIGMAP"i
+    KEY_KW.2: "KEY"i
+    AS_KW.2: "AS"i
+    TYPE_KW.2: "TYPE"i
+    ENGINE_KW.2: "ENGINE"i
+    SET_KW.2: "SET"i
+    FOR_KW.2: "FOR"i      
+    FROM_KW.2: "FROM"i    
+    THIS_KW.2: "THIS"i
+    TO_KW.2: "TO"i
+    KEY_PREFIX_KW.2: "KEY_PREFIX"i
+    DEPENDING_KW.2: "DEPENDING"i 
+
+    PYTHON_KW.2: "PYTHON"i
+    PYSPARK_KW.2: "PYSPARK"i
+    SQL_SPARK_KW.2: "SQL_SPARK"i
+    K8S_JOB_KW.2: "K8S_JOB"i
+    SPARK_OPERATOR_KW.2: "SPARK_OPERATOR"i
     
     // --- Definiciones para comandos de recursos estándar ---
-    resource_type_value_rule: SECRET_KW | CONFIGMAP_KW | PARAMETER_KW
+    ?resource_type_value_rule: SECRET_KW | CONFIGMAP_KW | PARAMETER_KW
     create_resource_command: CREATE_KW resource_type_value_rule NAME WITH_KW fields -> create_resource
     delete_resource_command: DELETE_KW resource_type_value_rule NAME -> delete_resource
     update_resource_command: UPDATE_KW resource_type_value_rule NAME WITH_KW fields -> update_resource
@@ -78,8 +82,8 @@ sql_grammar = r"""
                         | "CODE_FROM_FILE"i "=" ESCAPED_STRING -> script_code_from_file_field
                         | "PARAMS_SPEC"i "=" ESCAPED_STRING -> script_params_spec_field
                         | "DESCRIPTION"i "=" ESCAPED_STRING -> script_description_field
-    script_type_value: PYTHON_KW | PYSPARK_KW | SQL_SPARK_KW
-    script_engine_value: K8S_JOB_KW | SPARK_OPERATOR_KW
+    ?script_type_value: PYTHON_KW | PYSPARK_KW | SQL_SPARK_KW
+    ?script_engine_value: K8S_JOB_KW | SPARK_OPERATOR_KW
     
     list_scripts_command: LIST_KW SCRIPT_KW "S"? -> list_scripts 
     delete_script_command: DELETE_KW SCRIPT_KW NAME -> delete_script
@@ -92,10 +96,11 @@ sql_grammar = r"""
 
     // --- Comando EXECUTE SCRIPT ---
     with_args_clause: WITH_KW ARGS_KW "(" custom_params ")"
-    custom_params: custom_param ("," custom_param)*
-    custom_param: NAME "=" ESCAPED_STRING
+    custom_params: CUSTOM_PARAM ("," CUSTOM_PARAM)*
+    // Un par clave="valor" se reconoce como un único token; la clave sigue la forma de NAME
+    CUSTOM_PARAM: /[a-zA-Z0-9]([a-zA-Z0-9_.-]*[a-zA-Z0-9_])?\s*=\s*"(?:[^"\\\n]|\\.)*"/
     with_params_cm_clause: WITH_KW PARAMS_FROM_CONFIGMAP_KW NAME [KEY_PREFIX_KW ESCAPED_STRING] 
-    quoted_string_value: ESCAPED_STRING
+    ?quoted_string_value: ESCAPED_STRING
     secret_mount_clause: WITH_KW SECRET_KW NAME KEY_KW quoted_string_value AS_KW quoted_string_value -> map_secret_mount
     execute_script_command: EXECUTE_KW SCRIPT_KW NAME \
                             [with_args_clause] \
@@ -120,7 +125,7 @@ sql_grammar = r"""
     get_script_target_payload: SCRIPT_KW NAME -> get_script_target_transformer
     get_project_by_name_payload: PROJECT_KW NAME -> get_project_by_name_transformer
     get_this_project_payload: THIS_KW PROJECT_KW -> get_this_project_transformer
-    get_target_choice: get_script_target_payload
+    ?get_target_choice: get_script_target_payload
                      | get_project_by_name_payload
                      | get_this_project_payload
     get_command: GET_KW get_target_choice -> get_command_transformer
@@ -141,7 +146,67 @@ sql_grammar = r"""
     %ignore WS                   
 """
 
-kube_sol_parser = Lark(sql_grammar, parser="lalr", transformer=KubeTransformer(), maybe_placeholders=True) 
+def _grammar_cache_path():
+    """
+    Ruta del cache en disco de las tablas LALR, una por (gramática, versión de lark, versión de Python).
+    Si el directorio de cache no se puede crear, Lark usa su cache en el directorio temporal.
+    """
+    cache_dir = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "kubesol")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError:
+        return True
+    grammar_hash = hashlib.sha256(sql_grammar.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(
+        cache_dir,
+        f"grammar-{grammar_hash}-lark{lark.__version__}-py{sys.version_info[0]}{sys.version_info[1]}.cache",
+    )
+
+kube_sol_parser = Lark(sql_grammar, parser="lalr", transformer=KubeTransformer(), maybe_placeholders=True,
+                       cache=_grammar_cache_path())
 
 def parse_sql(input_sql_command: str) -> dict: 
-    return kube_sol_parser.parse(input_sql_command)
\ No newline at end of file
+    return kube_sol_parser.parse(input_sql_command)
+
+def split_statements(input_text: str) -> list[str]:
+    """
+    Splits input holding several ';'-terminated commands into one string per command (with its ';').
+    Semicolons inside double-quoted strings (the grammar's ESCAPED_STRING) do not split.
+    Blank pieces are dropped; unterminated trailing text is returned as the last command.
+    """
+    statements = []
+    start = 0
+    in_string = escaped = False
+    for index, char in enumerate(input_text):
+        if in_string:
+            if escaped: escaped = False
+            elif char == "\\": escaped = True
+            elif char == '"': in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == ";":
+            if input_text[start:index].strip():
+                statements.append(input_text[start:index + 1])
+            start = index + 1
+    if input_text[start:].strip():
+        statements.append(input_text[start:])
+    return statements
+
+class CommandParseError(Exception):
+    """Raised by parse_many: keeps the failing command and the original parser error."""
+    def __init__(self, index: int, command: str, error: Exception):
+        super().__init__(str(error))
+        self.index = index
+        self.command = command
+        self.error = error
+
+def parse_many(input_sql_commands: list[str]) -> list[dict]:
+    """Parses several commands in order with the shared parser; raises CommandParseError on the first failure."""
+    parse = kube_sol_parser.parse
+    parsed_commands = []
+    for index, command in enumerate(input_sql_commands):
+        try:
+            parsed_commands.append(parse(command))
+        except Exception as e:
+            raise CommandParseError(index, command, e) from e
+    return parsed_commands
\ No newline at end of file
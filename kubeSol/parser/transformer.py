@@ -1,22 +1,48 @@
 # kubeSol/parser/transformer.py
 from lark import Transformer, v_args, Token
 from kubeSol import constants # Asegúrate de que tus constantes estén bien definidas aquí
+from kubeSol.projects.context import THIS_PROJECT_CONTEXT
 import ast
+import sys
+
+def _canonical_name(name: str) -> str:
+    """
+    Forma canónica (minúsculas, internada) de un identificador de recurso, script, proyecto o entorno.
+    NAME conserva las mayúsculas porque también se usa para claves de campos y de argumentos.
+    """
+    return sys.intern(name.lower())
+
+def _unquote(quoted_value: str) -> str:
+    try:
+        return ast.literal_eval(quoted_value)
+    except (ValueError, SyntaxError):
+        # Fallback si ast.literal_eval falla
+        print(f"Warning: ast.literal_eval failed for ESCAPED_STRING: {quoted_value}. Using basic unquoting.")
+        return quoted_value[1:-1]
+
+def _unique_fields_dict(field_tuples_list: list) -> dict:
+    """Arma el dict de campos de un script en una sola pasada, rechazando claves repetidas."""
+    fields_dict = {}
+    for key, value in field_tuples_list:
+        if key in fields_dict:
+            raise ValueError(f"Field '{key}' is specified more than once.")
+        fields_dict[key] = value
+    return fields_dict
 
 class KubeTransformer(Transformer):
     # --- Transformadores de Terminales Básicos ---
     def NAME(self, token: Token) -> str:
         """Transforma un token NAME a su valor string."""
-        return str(token.value)
+        return token.value
 
     def ESCAPED_STRING(self, token: Token) -> str:
         """Transforma un token ESCAPED_STRING a su contenido string sin escapes."""
-        try:
-            return ast.literal_eval(token.value)
-        except (ValueError, SyntaxError):
-            # Fallback si ast.literal_eval falla
-            print(f"Warning: ast.literal_eval failed for ESCAPED_STRING: {token.value}. Using basic unquoting.")
-            return token.value[1:-1]
+        return _unquote(token.value)
+
+    def CUSTOM_PARAM(self, token: Token) -> tuple[str, str]:
+        """Separa un token CUSTOM_PARAM (clave="valor") en la tupla (clave, valor)."""
+        key_part, _, quoted_value = token.value.partition("=") # NAME no admite '=', así que el primero es el separador
+        return key_part.rstrip(), _unquote(quoted_value.lstrip())
 
     # --- Transformadores para Campos Genéricos (cláusula WITH) ---
     @v_args(inline=True)
@@ -71,14 +97,10 @@ class KubeTransformer(Transformer):
     def K8S_JOB_KW(self, token: Token): return constants.SCRIPT_ENGINE_K8S_JOB
     def SPARK_OPERATOR_KW(self, token: Token): return constants.SCRIPT_ENGINE_SPARK_OPERATOR
 
-    # --- Transformadores para Reglas de Recursos y Nombres ---
-    def resource_type_value_rule(self, items: list): return items[0] # Pasa el valor de SECRET_KW, etc.
-    # No se necesitan transformadores para 'resource_name' o 'script_name' si son solo 'NAME'
-    # y 'NAME' ya tiene su propio transformador. Los valores se pasarán directamente.
-
-    def script_type_value(self, items: list): return items[0] # Pasa el valor de PYTHON_KW, etc.
-    def script_engine_value(self, items: list): return items[0] # Pasa el valor de K8S_JOB_KW, etc.
-    def quoted_string_value(self, items: list): return items[0] # Pasa el string de ESCAPED_STRING
+    # --- Reglas de Recursos y Nombres ---
+    # resource_type_value_rule, script_type_value, script_engine_value y quoted_string_value son
+    # reglas transparentes (?rule) en la gramática: Lark las reemplaza por el valor de su único hijo.
+    # Tampoco se necesitan transformadores para nombres, ya que 'NAME' tiene su propio transformador.
 
     # --- Transformadores para Campos de Contenido de Script (CREATE SCRIPT) ---
     @v_args(inline=True)
@@ -95,27 +117,28 @@ class KubeTransformer(Transformer):
         return (constants.SCRIPT_CM_KEY_CODE_FROM_FILE, file_path_str)
     @v_args(inline=True)
     def script_params_spec_field(self, value_str: str): # Corrected signature
-        return (constants.SCRIPT_CM_KEY_PARAMS_SPEC, value_str)    @v_args(inline=True)
+        return (constants.SCRIPT_CM_KEY_PARAMS_SPEC, value_str)
+    @v_args(inline=True)
     def script_description_field(self, value_str: str): # Corrected signature
         return (constants.SCRIPT_CM_KEY_DESCRIPTION, value_str)
     def script_content_fields(self, field_tuples_list: list): 
         # This method receives a list of tuples from the methods above.
         # e.g., [ ("codeFromFilePath", "/path/to/file.py"), ("description", "A script") ]
-        return dict(field_tuples_list)
+        return _unique_fields_dict(field_tuples_list)
     # --- Transformadores para Comandos de Recursos Estándar ---
     @v_args(inline=True)
     def create_resource(self, create_kw_val, resource_type_val, name_str, with_kw_val, fields_dict):
         return {"action": constants.ACTION_CREATE, "type": resource_type_val, 
-                "name": name_str.lower(), "fields": fields_dict} # Canonicalizar nombre aquí también
+                "name": _canonical_name(name_str), "fields": fields_dict} 
 
     @v_args(inline=True)
     def delete_resource(self, delete_kw_val, resource_type_val, name_str):
-        return {"action": constants.ACTION_DELETE, "type": resource_type_val, "name": name_str.lower()}
+        return {"action": constants.ACTION_DELETE, "type": resource_type_val, "name": _canonical_name(name_str)}
 
     @v_args(inline=True)
     def update_resource(self, update_kw_val, resource_type_val, name_str, with_kw_val, fields_dict):
         return {"action": constants.ACTION_UPDATE, "type": resource_type_val, 
-                "name": name_str.lower(), "fields": fields_dict}
+                "name": _canonical_name(name_str), "fields": fields_dict}
 
     # --- Transformadores para Comandos de Script ---
     @v_args(inline=True)
@@ -157,7 +180,7 @@ class KubeTransformer(Transformer):
         return {
             "action": constants.ACTION_CREATE, 
             "type": constants.RESOURCE_SCRIPT, 
-            "name": script_name_str.lower(), 
+            "name": _canonical_name(script_name_str), 
             "details": details
         }
     
@@ -167,81 +190,77 @@ class KubeTransformer(Transformer):
 
     @v_args(inline=True)
     def delete_script(self, delete_keyword_val, script_keyword_val, script_name_str):
-        return {"action": constants.ACTION_DELETE, "type": constants.RESOURCE_SCRIPT, "name": script_name_str.lower()}
+        return {"action": constants.ACTION_DELETE, "type": constants.RESOURCE_SCRIPT, "name": _canonical_name(script_name_str)}
 
-    # Para campos de UPDATE SCRIPT
+    # Para campos de UPDATE SCRIPT ("CODE"i y "=" son literales anónimos y no se pasan)
     @v_args(inline=True)
-    def update_script_code_field(self, code_literal, eq_literal, value_str): return (constants.SCRIPT_CM_KEY_CODE, value_str)
+    def update_script_code_field(self, value_str): return (constants.SCRIPT_CM_KEY_CODE, value_str)
     @v_args(inline=True)
-    def update_script_params_spec_field(self, params_literal, eq_literal, value_str): return (constants.SCRIPT_CM_KEY_PARAMS_SPEC, value_str)
+    def update_script_params_spec_field(self, value_str): return (constants.SCRIPT_CM_KEY_PARAMS_SPEC, value_str)
     @v_args(inline=True)
-    def update_script_description_field(self, desc_literal, eq_literal, value_str): return (constants.SCRIPT_CM_KEY_DESCRIPTION, value_str)
+    def update_script_description_field(self, value_str): return (constants.SCRIPT_CM_KEY_DESCRIPTION, value_str)
     @v_args(inline=True)
-    def update_script_engine_field(self, engine_literal, eq_literal, engine_value_str): return (constants.SCRIPT_CM_KEY_ENGINE, engine_value_str)
-    def script_update_fields(self, field_tuples_list: list): return dict(field_tuples_list)
+    def update_script_engine_field(self, engine_value_str): return (constants.SCRIPT_CM_KEY_ENGINE, engine_value_str)
+    def script_update_fields(self, field_tuples_list: list): return _unique_fields_dict(field_tuples_list)
 
     @v_args(inline=True)
     def update_script(self, update_keyword_val, script_keyword_val, script_name_str, set_keyword_val, updates_dict):
         return {"action": constants.ACTION_UPDATE, "type": constants.RESOURCE_SCRIPT, 
-                "name": script_name_str.lower(), "updates": updates_dict}
+                "name": _canonical_name(script_name_str), "updates": updates_dict}
                 
     # --- Transformadores para Cláusulas de EXECUTE SCRIPT ---
-    @v_args(inline=True)
-    def custom_param(self, name_str, value_str): return (name_str, value_str)
     def custom_params(self, param_list: list): return dict(param_list)
     
+    # Cada cláusula opcional devuelve una tupla (clave_en_la_instrucción, valor) para que
+    # execute_script la asigne directamente, sin probar el contenido de cada resultado.
     @v_args(inline=True)
     def with_args_clause(self, with_kw_val, args_kw_val, params_dict):
-        return {"custom_args": params_dict} 
+        return ("custom_args", params_dict)
 
     @v_args(inline=True)
-    def with_params_cm_clause(self, with_kw_val, params_from_cm_kw_val, cm_name_str, optional_key_prefix_block):
+    def with_params_cm_clause(self, with_kw_val, params_from_cm_kw_val, cm_name_str, key_prefix_kw_val=None, key_prefix_str=None):
+        # Con maybe_placeholders=True, el bloque opcional [KEY_PREFIX_KW ESCAPED_STRING] llega como dos valores (o dos None)
         res = {"cm_name": cm_name_str}
-        if optional_key_prefix_block: # Es una lista [KEY_PREFIX_KW_val, prefix_str_val]
-            res["key_prefix"] = optional_key_prefix_block[1] 
-        return {"args_from_configmap": res}
+        if key_prefix_str is not None:
+            res["key_prefix"] = key_prefix_str
+        return ("args_from_configmap", res)
 
     @v_args(inline=True)
     def map_secret_mount(self, with_kw_val, secret_kw_val, secret_name_str, key_kw_val, key_in_secret_str, as_kw_val, mount_path_in_pod_str):
-        return {"type": "secret_mount_spec", "secret_name": secret_name_str, 
-                "key_in_secret": key_in_secret_str, "mount_path_in_pod": mount_path_in_pod_str}
+        return ("secret_mounts", {"type": "secret_mount_spec", "secret_name": secret_name_str, 
+                                  "key_in_secret": key_in_secret_str, "mount_path_in_pod": mount_path_in_pod_str})
 
     @v_args(inline=True) # El primer arg es el resultado de SCRIPT_KW
     def execute_script(self, execute_kw_val, script_keyword_val, script_name_str, *optional_clauses):
-        # script_name_str es el nombre del script
-        # optional_clauses es una tupla de los resultados de with_args_clause, with_params_cm_clause, y secret_mount_clause
+        # optional_clauses: resultados de with_args_clause y with_params_cm_clause (None si no están)
+        # seguidos de un resultado por cada secret_mount_clause
         instruction = {
             "action": constants.ACTION_EXECUTE, "type": constants.RESOURCE_SCRIPT, 
-            "name": script_name_str.lower(),
+            "name": _canonical_name(script_name_str),
             "custom_args": None, "args_from_configmap": None, "secret_mounts": []
         }
         for clause_result in optional_clauses:
-            if clause_result and isinstance(clause_result, dict): # Cada cláusula opcional devuelve un dict si coincide
-                if "custom_args" in clause_result:
-                    instruction["custom_args"] = clause_result["custom_args"]
-                elif "args_from_configmap" in clause_result:
-                    instruction["args_from_configmap"] = clause_result["args_from_configmap"]
-                # secret_mount_clause no devuelve un dict con una clave única, es el dict mismo.
-                # Si (secret_mount_clause)* se transforma, *optional_clauses tendrá una lista de estos.
-                # La gramática (secret_mount_clause)* significa que map_secret_mount se llamará varias veces
-                # y sus resultados se pasarán como argumentos individuales a execute_script después de los fijos.
-                elif clause_result.get("type") == "secret_mount_spec":
-                     instruction["secret_mounts"].append(clause_result)
+            if clause_result is None: continue
+            instruction_key, clause_value = clause_result
+            if instruction_key == "secret_mounts":
+                instruction["secret_mounts"].append(clause_value)
+            else:
+                instruction[instruction_key] = clause_value
         return instruction
 
     # --- Transformadores para Comandos de Proyecto/Entorno ---
     @v_args(inline=True)
     def create_project_cmd(self, create_kw_val, project_keyword_val, user_project_name_str):
         return {"action": constants.ACTION_CREATE_PROJECT, "type": constants.LOGICAL_TYPE_PROJECT,
-                "user_project_name": user_project_name_str.lower()}
+                "user_project_name": _canonical_name(user_project_name_str)}
 
     @v_args(inline=True)
     def specified_project_name_transformer(self, project_keyword_val, name_str): # Para PROJECT_KW NAME
-        return name_str.lower() # Devuelve solo el nombre, ya en minúsculas
+        return _canonical_name(name_str) # Devuelve solo el nombre, ya canónico
 
     @v_args(inline=True)
     def this_project_transformer(self, this_keyword_val, project_keyword_val): # Para THIS_KW PROJECT_KW
-        return "THIS_PROJECT_CONTEXT"
+        return THIS_PROJECT_CONTEXT
 
     @v_args(inline=True)
     def project_target_clause(self, for_or_from_keyword_val, project_specifier):
@@ -252,9 +271,9 @@ class KubeTransformer(Transformer):
     def create_env_cmd(self, create_kw_val, env_keyword_val, env_name_str, project_specifier=None, depends_on_env_name=None):
         # depends_on_env_name será None si la cláusula DEPENDS ON no está presente
         return {"action": constants.ACTION_CREATE_ENV, "type": constants.LOGICAL_TYPE_ENVIRONMENT,
-                "env_name": env_name_str.lower(),
+                "env_name": _canonical_name(env_name_str),
                 "project_name_specifier": project_specifier,
-                "depends_on_env": depends_on_env_name.lower() if depends_on_env_name else None
+                "depends_on_env": _canonical_name(depends_on_env_name) if depends_on_env_name else None
                 }
 
     @v_args(inline=True)
@@ -276,7 +295,7 @@ class KubeTransformer(Transformer):
     def get_script_target_transformer(self, script_keyword_val, script_name_str):
         return {
             "target_kind": constants.RESOURCE_SCRIPT, 
-            "name": script_name_str.lower()
+            "name": _canonical_name(script_name_str)
         }
 
 
@@ -285,30 +304,20 @@ class KubeTransformer(Transformer):
     def get_project_by_name_transformer(self, project_keyword_val, project_name_str):
         return {
             "target_kind": constants.LOGICAL_TYPE_PROJECT, 
-            "project_name_specifier": project_name_str.lower()
+            "project_name_specifier": _canonical_name(project_name_str)
         }
 
     @v_args(inline=True)
     def get_this_project_transformer(self, this_keyword_val, project_keyword_val):
         return {
             "target_kind": constants.LOGICAL_TYPE_PROJECT, 
-            "project_name_specifier": "THIS_PROJECT_CONTEXT"
+            "project_name_specifier": THIS_PROJECT_CONTEXT
         }
     
-    # get_target_choice no necesita un método de transformer, ya que @v_args(inline=True) en 
-    # get_command_transformer pasará el resultado del hijo que hizo match.
-    @v_args(inline=True)
-    def get_target_choice(self, chosen_target_payload):
-        # This method is called for the rule:
-        # get_target_choice: get_script_target_rule | get_project_by_name_target_rule | get_this_project_target_rule
-        # The argument 'chosen_target_payload' will be the dictionary returned by
-        # one of the above three _transformer methods that matched.
-        return chosen_target_payload # Simply pass the dictionary through
-
+    # get_target_choice es una regla transparente (?rule): get_command_transformer recibe
+    # directamente el diccionario del hijo que hizo match.
     @v_args(inline=True) 
     def get_command_transformer(self, get_keyword_val, target_payload_dict):
-        # Now, target_payload_dict should correctly be the dictionary returned by get_target_choice
-        
         target_kind = target_payload_dict["target_kind"] # This should no longer error
         action_to_dispatch = None
         final_instruction_dict = {
@@ -331,22 +340,22 @@ class KubeTransformer(Transformer):
     @v_args(inline=True) 
     def update_project_cmd(self, update_kw_val, project_kw_val, old_name_str, to_kw_val, new_name_str):
         return {"action": constants.ACTION_UPDATE_PROJECT, "type": constants.LOGICAL_TYPE_PROJECT,
-                "old_project_name": old_name_str.lower(), "new_project_name": new_name_str.lower()}
+                "old_project_name": _canonical_name(old_name_str), "new_project_name": _canonical_name(new_name_str)}
 
     @v_args(inline=True) 
     def drop_project_cmd(self, drop_kw_val, project_kw_val, project_name_str):
         return {"action": constants.ACTION_DROP_PROJECT, "type": constants.LOGICAL_TYPE_PROJECT,
-                "user_project_name": project_name_str.lower()}
+                "user_project_name": _canonical_name(project_name_str)}
 
     @v_args(inline=True) 
     def delete_env_cmd(self, drop_kw_val, env_kw_val, env_name_str, project_specifier=None):
         return {"action": constants.ACTION_DROP_ENV, "type": constants.LOGICAL_TYPE_ENVIRONMENT,
-                "env_name": env_name_str.lower(), "project_name_specifier": project_specifier}
+                "env_name": _canonical_name(env_name_str), "project_name_specifier": project_specifier}
     
     @v_args(inline=True) 
     def use_project_env_cmd(self, use_kw_val, project_kw_val, project_name_str, env_kw_val, env_name_str):
         return {"action": constants.ACTION_USE_PROJECT_ENV, "type": constants.LOGICAL_TYPE_PROJECT, 
-                "user_project_name": project_name_str.lower(), "env_name": env_name_str.lower()}
+                "user_project_name": _canonical_name(project_name_str), "env_name": _canonical_name(env_name_str)}
 
     # --- Transformadores Principales `command` y `start` ---
     def command(self, items):
@@ -9,5 +9,6 @@ and context switching for KubeSol projects and their associated environments
 # For now, this can be simple. We can expose key functions later if needed.
 # from .manager import create_project, list_projects # Example
 # from .cli_handlers import handle_create_project_cmd # Example
+import logging
 
-print("DEBUG: KubeSol projects package loaded.") # Optional: for confirming import during dev
\ No newline at end of file
+logging.getLogger(__name__).debug("KubeSol projects package loaded.") # For confirming import during dev
\ No newline at end of file
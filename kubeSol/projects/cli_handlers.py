@@ -4,35 +4,98 @@ Handlers for KubeSol project and environment CLI commands.
 These functions bridge the parsed command from the CLI/parser
 to the core logic in manager.py and update the shell's context.
 """
-from tabulate import tabulate
+import logging
+import sys
 from kubeSol.projects import manager
-from kubeSol.projects.context import KubeSolContext
+from kubeSol.projects.context import KubeSolContext, THIS_PROJECT_CONTEXT
 from kubeSol.constants import DEFAULT_NAMESPACE, DEFAULT_PROJECT_ENVIRONMENT
 # We should try to avoid direct k8s_api calls from handlers; manager should mediate.
 # from kubeSol.engine import k8s_api
 
+logger = logging.getLogger(__name__)
+
+_LIST_PROJECTS_HEADERS = ("Project Display Name", "Project ID", "Environments")
+_SWITCH_TO_NEW_PROJECT_PROMPT = "Project '%s' created. Switch to its default environment '%s' (namespace '%s')? (y/n): "
+
+_tabulate = None  # tabulate se importa en el primer uso para no cargarlo al arrancar el shell
+
+
+def grid_table(rows, headers) -> str:
+    """Renders rows as a 'grid' table; shared with the executor's resource/script listings."""
+    global _tabulate
+    if _tabulate is None:
+        from tabulate import tabulate as _tabulate
+    return _tabulate(rows, headers=headers, tablefmt="grid")
+
+# Mensajes de error de varias líneas: se emiten con un único print.
+_ERR_FOR_THIS_PROJECT_NO_CTX = (
+    "❌ 'FOR THIS PROJECT' specified, but no KubeSol project context is currently set.\n"
+    "   Use 'USE PROJECT <name> ENV <name>' first, or specify 'FOR PROJECT <name>'."
+)
+_ERR_CREATE_ENV_NO_CTX = (
+    "❌ Project not specified for CREATE ENV and no active KubeSol project context.\n"
+    "   Use 'FOR PROJECT <name>' or set a context with 'USE PROJECT ... ENV ...' first."
+)
+_ERR_GET_THIS_PROJECT_NO_CTX = (
+    "❌ 'GET THIS PROJECT' used, but no project context is currently active.\n"
+    "   Use 'USE PROJECT <name> ENV <name>' to set a context."
+)
+
+# Errores de _resolve_target_project por acción: (THIS PROJECT sin contexto, sin proyecto ni contexto, no resuelto)
+_TARGET_PROJECT_ERRORS = {
+    "CREATE ENV": (
+        _ERR_FOR_THIS_PROJECT_NO_CTX,
+        _ERR_CREATE_ENV_NO_CTX,
+        "❌ Internal Error: Could not determine target project ID or display name for creating environment.",
+    ),
+    "DROP ENV": (
+        "❌ 'FROM THIS PROJECT' specified, but no project context is set.",
+        "❌ Project not specified for DROP ENVIRONMENT and no active context. Use 'FROM PROJECT <name>' or 'USE PROJECT ...' first.",
+        "❌ Could not determine target project for dropping environment.",
+    ),
+}
+
 # Note: The 'context' object (instance of KubeSolContext) will be managed by the shell
 # and passed to these handler functions.
 
+def _resolve_target_project(project_specifier, context: KubeSolContext, action: str):
+    """
+    Resolves the project targeted by an environment command: THIS PROJECT, a named project,
+    or (when omitted) the active context. Returns (project_id, user_project_name), or None
+    after printing why it could not be resolved.
+    """
+    err_this_project, err_no_project, err_unresolved = _TARGET_PROJECT_ERRORS[action]
+    active = context.is_project_context_active()
+
+    if project_specifier is THIS_PROJECT_CONTEXT:
+        if not active:
+            print(err_this_project)
+            return None
+        project_id, user_project_name = context.project_id, context.user_project_name
+    elif project_specifier:
+        user_project_name = project_specifier
+        project_id = manager._resolve_project_id_from_display_name(user_project_name)
+        if not project_id: # Manager function already printed message
+            return None
+    else: # Implicit THIS PROJECT if context is set
+        if not active:
+            print(err_no_project)
+            return None
+        print(f"ℹ️ No project specified for {action}, using current project context: '{context.user_project_name}'.")
+        project_id, user_project_name = context.project_id, context.user_project_name
+
+    if not project_id or not user_project_name: # Should be caught by above logic
+        print(err_unresolved)
+        return None
+    return project_id, user_project_name
+
 def handle_create_project(parsed_args: dict, context: KubeSolContext):
     """Handles the CREATE PROJECT <project_name> command."""
-    # --- BEGIN DEBUG PRINTS for "Project name is required" issue ---
-    print(f"DEBUG_HANDLER: Inside handle_create_project.")
-    print(f"DEBUG_HANDLER: Type of parsed_args received: {type(parsed_args)}")
-    print(f"DEBUG_HANDLER: Content of parsed_args received: {parsed_args!r}")
-    
-    key_to_check = "user_project_name" # Key from transformer for create_project_cmd
-    print(f"DEBUG_HANDLER: Attempting to get key: '{key_to_check}'")
-    
-    project_name_to_create = parsed_args.get(key_to_check)
-    
-    print(f"DEBUG_HANDLER: Value of project_name_to_create: {project_name_to_create!r}")
-    print(f"DEBUG_HANDLER: Type of project_name_to_create: {type(project_name_to_create)}")
-    print(f"DEBUG_HANDLER: Boolean evaluation of (not project_name_to_create): {not project_name_to_create}")
-    # --- END DEBUG PRINTS ---
+    logger.debug("handle_create_project parsed_args=%r", parsed_args)
+    project_name_to_create = parsed_args.get("user_project_name") # Key from transformer for create_project_cmd
 
     if not project_name_to_create: 
-        print("❌ Error: Project name must be provided for CREATE PROJECT. (Value was falsy)")
+        print("❌ Error: Project name must be provided for CREATE PROJECT.")
         return
     
     # Call the manager function to perform the action
@@ -42,48 +105,29 @@ def handle_create_project(parsed_args: dict, context: KubeSolContext):
         # If no specific project context was active before, or if it's a different project,
         # offer to switch to the new one.
         if not context.is_project_context_active() or context.project_id != proj_id:
-            confirm_use = input(f"Project '{user_proj_name}' created. Switch to its default environment '{def_env}' (namespace '{def_ns}')? (y/n): ").strip().lower()
+            # Sin TTY (CI, tuberías) no se pregunta: por defecto no se cambia de contexto.
+            if not sys.stdin.isatty():
+                confirm_use = 'n'
+            else:
+                confirm_use = input(_SWITCH_TO_NEW_PROJECT_PROMPT % (user_proj_name, def_env, def_ns)).strip().lower()
             if confirm_use == 'y':
                 context.set_project_env_context(user_proj_name, proj_id, def_env, def_ns)
 
 def handle_create_environment(parsed_args: dict, context: KubeSolContext):
     """Handles CREATE ENV <env_name> [FOR PROJECT <project_name> | FOR THIS PROJECT] [DEPENDS ON <parent_env_name>]"""
-    env_name_to_create = parsed_args.get("env_name")
-    project_specifier = parsed_args.get("project_name_specifier")
-    depends_on_env_name = parsed_args.get("depends_on_env") # <--- Capturar el nombre del entorno del cual depende
+    get = parsed_args.get
+    env_name_to_create = get("env_name")
+    project_specifier = get("project_name_specifier")
+    depends_on_env_name = get("depends_on_env") # <--- Capturar el nombre del entorno del cual depende
 
     if not env_name_to_create:
         print("❌ Error: Environment name must be provided for CREATE ENV.")
         return
 
-    target_project_id = None
-    target_user_project_name = None
-
-    if project_specifier:
-        if project_specifier.upper() == "THIS_PROJECT_CONTEXT":
-            if not context.is_project_context_active():
-                print("❌ 'FOR THIS PROJECT' specified, but no KubeSol project context is currently set.")
-                print("   Use 'USE PROJECT <name> ENV <name>' first, or specify 'FOR PROJECT <name>'.")
-                return
-            target_project_id = context.project_id
-            target_user_project_name = context.user_project_name
-        else:
-            target_user_project_name = project_specifier
-            target_project_id = manager._resolve_project_id_from_display_name(target_user_project_name)
-            if not target_project_id:
-                return
-    else:
-        if not context.is_project_context_active():
-            print("❌ Project not specified for CREATE ENV and no active KubeSol project context.")
-            print("   Use 'FOR PROJECT <name>' or set a context with 'USE PROJECT ... ENV ...' first.")
-            return
-        print(f"ℹ️ No project specified for CREATE ENV, using current project context: '{context.user_project_name}'.")
-        target_project_id = context.project_id
-        target_user_project_name = context.user_project_name
-
-    if not target_project_id or not target_user_project_name:
-        print("❌ Internal Error: Could not determine target project ID or display name for creating environment.")
+    target = _resolve_target_project(project_specifier, context, "CREATE ENV")
+    if target is None:
         return
+    target_project_id, target_user_project_name = target
 
     # Llamar a la función del manager con el nuevo parámetro depends_on_env_name
     manager.add_environment_to_project(
@@ -99,41 +143,33 @@ def handle_list_projects(parsed_args: dict, context: KubeSolContext):
         print("ℹ️ No KubeSol projects found.")
         return
     
-    # Nuevos headers y datos para la tabla
-    headers = ["Project Display Name", "Project ID", "Environments"] 
-    table_data = []
-    for p_info in projects_data:
-        # Unir los nombres de entorno en un string separado por comas
-        # environment_names es una lista de strings (ya en minúsculas desde el manager)
-        environments_str = ", ".join(p_info.get("environment_names", []))
-        if not environments_str: environments_str = "-" # Si no hay entornos
-
-        table_data.append([
-            p_info.get("project_display_name", "N/A"), 
-            p_info.get("project_id", "N/A"),
-            environments_str # Mostrar la lista de entornos
-        ])
+    # environment_names es una lista de strings (ya en minúsculas desde el manager); "-" si no hay entornos
+    table_data = [
+        (p_info.get("project_display_name", "N/A"), p_info.get("project_id", "N/A"),
+         ", ".join(p_info.get("environment_names", ())) or "-")
+        for p_info in projects_data
+    ]
     
     print("\n KubeSol Projects:")
-    print(tabulate(table_data, headers=headers, tablefmt="grid"))
+    print(grid_table(table_data, _LIST_PROJECTS_HEADERS))
 
 
 def handle_get_project(parsed_args: dict, context: KubeSolContext):
     """Handles GET PROJECT <name> or GET THIS PROJECT."""
     project_specifier = parsed_args.get("project_name_specifier")
     target_user_project_name_to_query = None
+    active = context.is_project_context_active() # implica que user_project_name está fijado
 
-    if project_specifier == "THIS_PROJECT_CONTEXT":
-        if not context.is_project_context_active() or not context.user_project_name:
-            print("❌ 'GET THIS PROJECT' used, but no project context is currently active.")
-            print("   Use 'USE PROJECT <name> ENV <name>' to set a context.")
+    if project_specifier is THIS_PROJECT_CONTEXT:
+        if not active:
+            print(_ERR_GET_THIS_PROJECT_NO_CTX)
             return
         target_user_project_name_to_query = context.user_project_name
         print(f"ℹ️ 'GET THIS PROJECT' resolved to current project: '{target_user_project_name_to_query}'")
     elif project_specifier: 
         target_user_project_name_to_query = project_specifier
     else: 
-        if not context.is_project_context_active() or not context.user_project_name:
+        if not active:
             print("❌ Project name not specified and no project context is active for GET PROJECT.")
             return
         print(f"ℹ️ No project name specified for GET PROJECT, using current project context: '{context.user_project_name}'.")
@@ -144,7 +180,7 @@ def handle_get_project(parsed_args: dict, context: KubeSolContext):
     if environments_data:
         # Determine display name and ID from the first environment, assuming consistency for the queried project
         proj_id_display = environments_data[0].get('project_id', 'N/A')
-        # Use the display name that was actually queried or from context if it was "THIS_PROJECT_CONTEXT"
+        # Use the display name that was actually queried or from context if it was THIS_PROJECT_CONTEXT
         # The labels might have a slightly different casing if manually changed, so manager might return the actual label value.
         actual_display_name_from_results = environments_data[0].get('project_display_name', target_user_project_name_to_query)
 
@@ -158,13 +194,14 @@ def handle_get_project(parsed_args: dict, context: KubeSolContext):
                 e_info.get("status", "N/A"), 
                 e_info.get("created", "N/A")
             ])
-        print(tabulate(table_data, headers=headers, tablefmt="grid"))
+        print(grid_table(table_data, headers))
     # else: manager.get_environments_for_project already prints "not found" or "no environments"
 
 def handle_update_project(parsed_args: dict, context: KubeSolContext):
     """Handles UPDATE PROJECT <old_name> TO <new_name>."""
-    old_display_name = parsed_args.get("old_project_name")
-    new_display_name = parsed_args.get("new_project_name")
+    get = parsed_args.get
+    old_display_name = get("old_project_name")
+    new_display_name = get("new_project_name")
 
     if not old_display_name or not new_display_name:
         print("❌ Both old and new project display names must be provided for UPDATE PROJECT.")
@@ -210,38 +247,18 @@ def handle_drop_project(parsed_args: dict, context: KubeSolContext):
 
 def handle_drop_environment(parsed_args: dict, context: KubeSolContext):
     """Handles DROP ENVIRONMENT <env_name> [FROM PROJECT <name> | FROM THIS PROJECT]."""
-    env_name_to_drop = parsed_args.get("env_name")
-    project_specifier = parsed_args.get("project_name_specifier")
+    get = parsed_args.get
+    env_name_to_drop = get("env_name")
+    project_specifier = get("project_name_specifier")
 
     if not env_name_to_drop:
         print("❌ Environment name must be provided for DROP ENVIRONMENT.")
         return
 
-    target_project_id = None
-    target_user_project_name = None
-
-    if project_specifier and project_specifier.upper() == "THIS_PROJECT_CONTEXT":
-        if not context.is_project_context_active():
-            print("❌ 'FROM THIS PROJECT' specified, but no project context is set.")
-            return
-        target_project_id = context.project_id
-        target_user_project_name = context.user_project_name
-    elif project_specifier:
-        target_user_project_name = project_specifier
-        target_project_id = manager._resolve_project_id_from_display_name(target_user_project_name)
-        if not target_project_id: # Manager function already printed message
-            return 
-    else: # Implicit THIS PROJECT if context is set
-        if not context.is_project_context_active():
-            print("❌ Project not specified for DROP ENVIRONMENT and no active context. Use 'FROM PROJECT <name>' or 'USE PROJECT ...' first.")
-            return
-        print(f"ℹ️ No project specified for DROP ENV, using current project context: '{context.user_project_name}'.")
-        target_project_id = context.project_id
-        target_user_project_name = context.user_project_name
-
-    if not target_project_id or not target_user_project_name: # Should be caught by above logic
-        print("❌ Could not determine target project for dropping environment.")
+    target = _resolve_target_project(project_specifier, context, "DROP ENV")
+    if target is None:
         return
+    target_project_id, target_user_project_name = target
 
     # Confirmation is handled inside manager.delete_project_environment
     success = manager.delete_project_environment(
@@ -265,25 +282,29 @@ def handle_drop_environment(parsed_args: dict, context: KubeSolContext):
             # Let's just update the prompt based on the cleared environment.
             context.set_namespace_context(context.current_namespace) # This will clear project/env name if ns is default
                                                                     # or just set namespace and clear env name.
-            print(f"   Current environment context cleared. Namespace set to '{context.current_namespace}'.")
-            print(f"   You may want to 'USE PROJECT {context.user_project_name} ENV <another_env>' or 'USE PROJECT ... ENV dev'.")
+            print(f"   Current environment context cleared. Namespace set to '{context.current_namespace}'.\n"
+                  f"   You may want to 'USE PROJECT {context.user_project_name} ENV <another_env>' or 'USE PROJECT ... ENV dev'.")
         else: # Should not happen if context.project_id was valid
             context.clear_project_context()
 
 
 def handle_use_project_environment(parsed_args: dict, context: KubeSolContext):
     """Handles USE PROJECT <project_name> ENV <env_name>."""
-    project_name_to_use = parsed_args.get("user_project_name")
-    env_name_to_use = parsed_args.get("env_name")
+    get = parsed_args.get
+    project_name_to_use = get("user_project_name")
+    env_name_to_use = get("env_name")
 
     if not project_name_to_use or not env_name_to_use:
         print("❌ Both project display name and environment name are required for USE command.")
         return
     
+    # Switching environments inside the active project: its ID is already known
+    known_project_id = context.project_id if context.user_project_name == project_name_to_use else None
     # manager.resolve_project_and_environment_namespaces returns (proj_id, user_proj_name, physical_ns, error_msg)
     proj_id, resolved_user_proj_name, physical_ns, error_msg = manager.resolve_project_and_environment_namespaces(
         user_project_name=project_name_to_use,
-        environment_name=env_name_to_use
+        environment_name=env_name_to_use,
+        project_id=known_project_id
     )
     
     if error_msg:
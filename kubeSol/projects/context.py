@@ -5,23 +5,45 @@ An instance of KubeSolContext will be managed by the main shell.
 """
 from kubeSol.constants import DEFAULT_NAMESPACE #
 
+class _ThisProjectContext:
+    """Type of the THIS_PROJECT_CONTEXT sentinel; compared by identity."""
+    __slots__ = ()
+    def __repr__(self): return "THIS_PROJECT_CONTEXT"
+
+# Emitted by the parser for 'FOR/FROM THIS PROJECT' and 'GET THIS PROJECT'
+THIS_PROJECT_CONTEXT = _ThisProjectContext()
+
+# Estados del prompt; cada setter de contexto fija el suyo, así el prompt no re-evalúa los atributos
+_PROMPT_STATE_PROJECT_ENV = 0
+_PROMPT_STATE_NAMESPACE = 1
+_PROMPT_STATE_DEFAULT = 2
+
 class KubeSolContext:
+    __slots__ = ("user_project_name", "project_id", "environment_name", "current_namespace",
+                 "prompt_prefix", "_prompt", "_continuation_prompt", "_prompt_state")
+
+    # Constructores del prefijo del prompt, indexados por estado
+    _prompt_prefix_builders = (
+        lambda ctx: f"({ctx.user_project_name}/{ctx.environment_name})",
+        lambda ctx: f"({ctx.current_namespace})",
+        lambda ctx: f"({DEFAULT_NAMESPACE})",
+    )
+
     def __init__(self):
         self.user_project_name: str | None = None
         self.project_id: str | None = None
         self.environment_name: str | None = None
         # current_namespace always reflects the actual Kubernetes namespace to target
         self.current_namespace: str = DEFAULT_NAMESPACE
+        self._prompt_state = _PROMPT_STATE_DEFAULT
         self._update_prompt_prefix() # Initialize prompt prefix
 
     def _update_prompt_prefix(self):
         """Internal helper to update the prompt string component."""
-        if self.user_project_name and self.environment_name:
-            self.prompt_prefix = f"({self.user_project_name}/{self.environment_name})"
-        elif self.current_namespace and self.current_namespace != DEFAULT_NAMESPACE:
-            self.prompt_prefix = f"({self.current_namespace})"
-        else:
-            self.prompt_prefix = f"({DEFAULT_NAMESPACE})"
+        self.prompt_prefix = self._prompt_prefix_builders[self._prompt_state](self)
+        # Los prompts completos se arman solo cuando cambia el contexto, no en cada lectura de línea
+        self._prompt = f"{self.prompt_prefix} >> "
+        self._continuation_prompt = f"{self.prompt_prefix} ... "
 
     def set_project_env_context(self, user_project_name: str, project_id: str, environment_name: str, namespace: str):
         """Sets the full project and environment context."""
@@ -29,6 +51,7 @@ class KubeSolContext:
         self.project_id = project_id
         self.environment_name = environment_name
         self.current_namespace = namespace
+        self._prompt_state = _PROMPT_STATE_PROJECT_ENV
         self._update_prompt_prefix()
         print(f"ℹ️ Context set to Project: '{self.user_project_name}' (ID: {self.project_id}), Environment: '{self.environment_name}' (Namespace: '{self.current_namespace}')")
 
@@ -44,6 +67,7 @@ class KubeSolContext:
              print(f"ℹ️ Current namespace set to default: '{self.current_namespace}'. Project context cleared.")
         else:
             print(f"ℹ️ Current namespace set to '{self.current_namespace}'. Project/environment context needs to be set via 'USE PROJECT' for full functionality.")
+        self._prompt_state = _PROMPT_STATE_NAMESPACE if namespace and namespace != DEFAULT_NAMESPACE else _PROMPT_STATE_DEFAULT
         self._update_prompt_prefix()
 
 
@@ -53,20 +77,22 @@ class KubeSolContext:
         self.project_id = None
         self.environment_name = None
         self.current_namespace = DEFAULT_NAMESPACE # Revert to default namespace
+        self._prompt_state = _PROMPT_STATE_DEFAULT
         self._update_prompt_prefix()
         print(f"ℹ️ Project context cleared. Current namespace is '{self.current_namespace}'.")
 
     def get_prompt(self) -> str:
         """Returns the current command prompt string."""
-        return f"{self.prompt_prefix} >> "
+        return self._prompt
     
     def get_continuation_prompt(self) -> str:
         """Returns the continuation prompt string for multi-line input."""
-        return f"{self.prompt_prefix} ... "
+        return self._continuation_prompt
 
-    def is_project_context_active(self) -> bool: # << इंश्योर THIS METHOD EXISTS
+    def is_project_context_active(self) -> bool:
         """Checks if a KubeSol project context (ID and name) is currently active."""
-        return bool(self.project_id and self.user_project_name)
+        # Solo set_project_env_context fija este estado, y siempre con ID y nombre
+        return self._prompt_state == _PROMPT_STATE_PROJECT_ENV
 
     def __str__(self):
         if self.user_project_name and self.environment_name:
@@ -3,8 +3,19 @@
 Core logic for managing KubeSol projects and environments.
 Interacts with the k8s_api module to manipulate namespaces and their labels.
 """
+import functools
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import heapq
+from collections import defaultdict
+from operator import itemgetter
+from types import MappingProxyType
+from typing import Iterator
 import uuid
+import string
 import re # Import re for sanitizing environment names in _get_physical_namespace_name
+import sys
 from kubeSol.engine import k8s_api 
 from kubeSol.constants import (
     PROJECT_ID_LABEL_KEY, 
@@ -21,92 +32,186 @@ from kubeSol.constants import (
 )
 from kubeSol.integrations import github_api
 
+logger = logging.getLogger(__name__)
+
 # --- Internal Helper Functions ---
 
+# Sustituto de metadata.labels cuando es None, para poder llamar .get sin comprobarlo; de solo lectura
+_EMPTY_LABELS = MappingProxyType({})
+
+# Label selectors: todos los namespaces de KubeSol, y prefijos de los selectores por ID / por nombre
+_ALL_PROJECTS_SELECTOR = PROJECT_ID_LABEL_KEY
+_PROJECT_ID_SELECTOR_PREFIX = f"{PROJECT_ID_LABEL_KEY}="
+_PROJECT_NAME_SELECTOR_PREFIX = f"{PROJECT_NAME_LABEL_KEY}="
+
+# Caracteres no válidos en nombres de namespace/repo/rama; se reemplazan por '-'
+_K8S_NAME_INVALID_CHARS_RE = re.compile(r'[^a-z0-9-]+')
+# Tabla de str.translate que borra los caracteres válidos: si no queda nada, el nombre ya es válido
+_DELETE_VALID_K8S_NAME_CHARS = str.maketrans("", "", string.ascii_lowercase + string.digits + "-")
+
+def _replace_invalid_k8s_name_chars(name: str) -> str:
+    """Replaces each run of characters outside [a-z0-9-] with '-'."""
+    if not name.translate(_DELETE_VALID_K8S_NAME_CHARS):
+        return name # Caso habitual (nombres ya válidos): un bucle en C, sin motor de regex
+    return _K8S_NAME_INVALID_CHARS_RE.sub('-', name)
+
+# Sufijo de hash que distingue entornos cuyos nombres se truncan al mismo prefijo ('-' + 6 hex)
+_TRUNCATED_NAME_HASH_BYTES = 3
+_TRUNCATED_NAME_SUFFIX_LEN = 1 + 2 * _TRUNCATED_NAME_HASH_BYTES
+
 def _generate_project_id() -> str:
     return f"proj-{uuid.uuid4().hex[:12]}"
 
+@functools.lru_cache(maxsize=32)
+def _namespace_namer_for(project_id: str):
+    """Builds the env -> namespace-name function for one project, with the prefix and its length budget precomputed."""
+    prefix = f"{project_id}-"[:63]
+    max_env_len = 63 - len(prefix)
+    def namer(environment_name: str) -> str:
+        env_name_sanitized = _replace_invalid_k8s_name_chars(environment_name).strip('-') or "env"
+        if len(env_name_sanitized) > max_env_len:
+            # Truncar a secas haría colisionar nombres largos con el mismo prefijo
+            name_hash = hashlib.blake2b(environment_name.encode(), digest_size=_TRUNCATED_NAME_HASH_BYTES).hexdigest()
+            env_name_sanitized = f"{env_name_sanitized[:max_env_len - _TRUNCATED_NAME_SUFFIX_LEN].rstrip('-')}-{name_hash}"
+        return prefix + env_name_sanitized
+    return namer
+
 def _get_physical_namespace_name(project_id: str, environment_name: str) -> str:
-    env_name_sanitized = re.sub(r'[^a-z0-9-]+', '-', environment_name).strip('-')
-    if not env_name_sanitized: env_name_sanitized = "env"
-    return f"{project_id}-{env_name_sanitized}"[:63]
+    return _namespace_namer_for(project_id)(environment_name)
+
+def _get_legacy_physical_namespace_name(project_id: str, environment_name: str) -> str | None:
+    """
+    Name given to over-long environments before the hash suffix existed (plain truncation at 63 chars).
+    None when the environment name fits, since then both namers agree.
+    """
+    prefix = f"{project_id}-"[:63]
+    env_name_sanitized = _replace_invalid_k8s_name_chars(environment_name).strip('-') or "env"
+    if len(prefix) + len(env_name_sanitized) <= 63: return None
+    return prefix + env_name_sanitized[:63 - len(prefix)]
+
+def _get_environment_namespace(project_id: str, environment_name: str):
+    """
+    GETs the namespace of an environment. Environments created before the hash suffix keep their
+    truncated name: if the current name is not found, the legacy one is tried, and accepted only if
+    its labels belong to this project and environment (truncation could map several envs to it).
+    """
+    ns_obj = k8s_api.get_k8s_namespace(_get_physical_namespace_name(project_id, environment_name))
+    if ns_obj: return ns_obj
+    legacy_name = _get_legacy_physical_namespace_name(project_id, environment_name)
+    if not legacy_name: return None
+    legacy_ns = k8s_api.get_k8s_namespace(legacy_name)
+    if not legacy_ns: return None
+    labels = legacy_ns.metadata.labels or _EMPTY_LABELS
+    if labels.get(PROJECT_ID_LABEL_KEY) == project_id and labels.get(ENVIRONMENT_LABEL_KEY) == environment_name:
+        return legacy_ns
+    return None
+
+def _list_namespaces_with_display_name(user_project_name_lower: str) -> list:
+    """Metadata of the namespaces labelled with this project display name (one API listing)."""
+    return k8s_api.list_namespace_metadata(label_selector=_PROJECT_NAME_SELECTOR_PREFIX + user_project_name_lower,
+                                           from_watch_cache=True)
+
+def _project_ids_in(namespaces: list) -> set[str]:
+    project_ids = {(ns_obj.metadata.labels or _EMPTY_LABELS).get(PROJECT_ID_LABEL_KEY) for ns_obj in namespaces}
+    project_ids.discard(None)
+    return project_ids
 
 def _check_project_display_name_exists(user_project_name_lower: str) -> str | None:
-    label_selector = f"{PROJECT_NAME_LABEL_KEY}={user_project_name_lower}"
-    namespaces = k8s_api.list_k8s_namespaces(label_selector=label_selector)
-    project_ids_found = set()
-    if namespaces:
-        for ns_obj in namespaces:
-            if ns_obj.metadata and ns_obj.metadata.labels:
-                proj_id = ns_obj.metadata.labels.get(PROJECT_ID_LABEL_KEY)
-                if proj_id: project_ids_found.add(proj_id)
+    """Returns a project ID already using this display name (warning if several do), else None. Prints nothing when free."""
+    # Chequeo previo a una escritura: lectura consistente (ni watch cache ni caché TTL). Basta con saber
+    # si existe: dos namespaces alcanzan para detectar (best effort) IDs distintos
+    namespaces = k8s_api.list_namespace_metadata(label_selector=_PROJECT_NAME_SELECTOR_PREFIX + user_project_name_lower,
+                                                 limit=2, use_cache=False)
+    project_ids_found = _project_ids_in(namespaces)
     if not project_ids_found: return None
     if len(project_ids_found) > 1:
-        print(f"⚠️ Warning: Project name '{user_project_name_lower}' associated with multiple IDs: {project_ids_found}.")
-    return list(project_ids_found)[0]
+        logger.warning("⚠️ Warning: Project name '%s' associated with multiple IDs: %s.", user_project_name_lower, project_ids_found)
+    return next(iter(project_ids_found))
+
 
+class _ProjectNotResolved(LookupError):
+    """Raised when a display name does not map to exactly one project ID; keeps failed lookups out of the cache."""
+
+def _load_project_index(use_cache: bool = True) -> tuple[dict[str, set[str]], dict[str, list]]:
+    """
+    Lists every KubeSol namespace once and indexes it in memory.
+    Returns (name_to_ids, id_to_namespaces): display name -> project IDs carrying it,
+    and project ID -> its V1Namespace objects.
+    Pass use_cache=False when the index guards a write, so it reflects other clients' changes.
+    """
+    name_to_ids: dict[str, set[str]] = {}
+    id_to_namespaces: dict[str, list] = {}
+    for ns_obj in k8s_api.list_namespace_metadata(label_selector=_ALL_PROJECTS_SELECTOR, use_cache=use_cache):
+        labels = ns_obj.metadata.labels or _EMPTY_LABELS
+        proj_id = labels.get(PROJECT_ID_LABEL_KEY)
+        if not proj_id: continue
+        id_to_namespaces.setdefault(proj_id, []).append(ns_obj)
+        display_name = labels.get(PROJECT_NAME_LABEL_KEY)
+        if display_name:
+            name_to_ids.setdefault(display_name, set()).add(proj_id)
+    return name_to_ids, id_to_namespaces
+
+def _pick_unique_project_id(user_project_name_lower: str, project_ids: set[str]) -> str:
+    """Returns the only ID in project_ids, or reports the problem and raises _ProjectNotResolved."""
+    if not project_ids:
+        logger.info("ℹ️ Project with display name '%s' not found.", user_project_name_lower)
+        raise _ProjectNotResolved(user_project_name_lower)
+    if len(project_ids) > 1:
+        logger.error("❌ Error: Ambiguous project display name '%s'. Multiple project IDs found: %s.\n"
+                     "   This indicates an inconsistent state. Please resolve label conflicts or use Project ID for operations.",
+                     user_project_name_lower, project_ids)
+        raise _ProjectNotResolved(user_project_name_lower)
+    return next(iter(project_ids))
+
+@functools.lru_cache(maxsize=128)
+def _lookup_unique_project_id(user_project_name_lower: str) -> str:
+    namespaces = _list_namespaces_with_display_name(user_project_name_lower)
+
+    # Caso habitual: todos los namespaces comparten un ID, sin crear set ni lista
+    first_id = None
+    for ns_obj in namespaces:
+        proj_id = (ns_obj.metadata.labels or _EMPTY_LABELS).get(PROJECT_ID_LABEL_KEY)
+        if not proj_id: continue
+        if first_id is None:
+            first_id = proj_id
+        elif proj_id != first_id: # Ambiguo: se reúnen todos los IDs para el mensaje de error
+            return _pick_unique_project_id(user_project_name_lower, _project_ids_in(namespaces))
+    if first_id is None:
+        return _pick_unique_project_id(user_project_name_lower, set())
+    return first_id
 
 def _resolve_project_id_from_display_name(user_project_name_lower: str) -> str | None:
     """
     Finds the unique project_id for a given user_project_name.
     Returns project_id if found and unique, else None.
+    Successful lookups are cached for the shell session; see invalidate_project_id_cache.
     """
-    label_selector = f"{PROJECT_NAME_LABEL_KEY}={user_project_name_lower}"
-    namespaces = k8s_api.list_k8s_namespaces(label_selector=label_selector)
-
-    project_ids = set()
-    if namespaces:
-        for ns_obj in namespaces:
-            if ns_obj.metadata and ns_obj.metadata.labels and PROJECT_ID_LABEL_KEY in ns_obj.metadata.labels:
-                project_ids.add(ns_obj.metadata.labels[PROJECT_ID_LABEL_KEY])
-
-    if not project_ids:
-        print(f"ℹ️ Project with display name '{user_project_name_lower}' not found.")
+    try:
+        return _lookup_unique_project_id(user_project_name_lower)
+    except _ProjectNotResolved:
         return None
-    if len(project_ids) > 1:
-        print(f"❌ Error: Ambiguous project display name '{user_project_name_lower}'. Multiple project IDs found: {project_ids}.")
-        print(f"   This indicates an inconsistent state. Please resolve label conflicts or use Project ID for operations.")
-        return None
-    return list(project_ids)[0]
 
+def invalidate_project_id_cache():
+    """Drops cached display-name -> project_id lookups. Called after any project/environment mutation."""
+    _lookup_unique_project_id.cache_clear()
+
+@functools.lru_cache(maxsize=1024)
 def _get_project_github_repo_name(project_display_name: str) -> str:
     """Genera el nombre del repositorio de GitHub para un proyecto."""
-    sanitized_name = re.sub(r'[^a-z0-9-]+', '-', project_display_name.lower()).strip('-')
+    sanitized_name = _replace_invalid_k8s_name_chars(project_display_name.lower()).strip('-')
     return f"{GITHUB_REPO_PREFIX}{sanitized_name}"
 
+@functools.lru_cache(maxsize=1024)
 def _get_github_branch_name_for_env(env_name: str) -> str:
     """Mapea un nombre de entorno a un nombre de rama de GitHub si es necesario."""
     # Podrías tener lógica más compleja aquí, ej. 'prod' -> 'master', 'dev' -> 'develop'
     # Por ahora, simplemente sanitizamos el nombre del entorno.
-    return re.sub(r'[^a-z0-9-]+', '-', env_name.lower()).strip('-')
+    return _replace_invalid_k8s_name_chars(env_name.lower()).strip('-')
 
 # --- Public Management Functions ---
 
-def create_new_project(user_project_name: str) -> tuple[str | None, str | None, str | None, str | None]:
-    print(f"Attempting to create new project with display name: '{user_project_name}'...")
-    existing_project_id = _check_project_display_name_exists(user_project_name)
-    if existing_project_id:
-        print(f"❌ Error: Project with display name '{user_project_name}' already exists (ID: '{existing_project_id}').")
-        return None, None, None, None
-
-    project_id = _generate_project_id()
-    default_env = DEFAULT_PROJECT_ENVIRONMENT
-    namespace_name = _get_physical_namespace_name(project_id, default_env)
-
-    project_repo_name = _get_project_github_repo_name(user_project_name)
-    project_repo_url = None
-
-    # 1. Crear el repositorio de GitHub
-    print(f"ℹ️ Creating GitHub repository '{project_repo_name}' for project '{user_project_name}'...")
-    project_repo_url = github_api.create_github_repository(
-        repo_name=project_repo_name,
-        description=f"KubeSol project '{user_project_name}' (ID: {project_id})"
-    )
-    if not project_repo_url:
-        print(f"❌ Failed to create GitHub repository '{project_repo_name}'. Aborting project creation.")
-        return None, None, None, None
-
-    # 2. Empujar un commit inicial a la rama por defecto (main)
+def _initialize_project_repository(project_repo_name: str, user_project_name: str, dev_git_branch_name: str) -> bool:
+    """Pushes the initial README commit to the default branch and creates the develop branch from it."""
     # Esto es CRUCIAL para que el repositorio no esté vacío y se puedan crear ramas a partir de ella.
     readme_content = f"# KubeSol Project: {user_project_name}\n\nThis repository holds scripts and configurations for the KubeSol project '{user_project_name}'.\n"
     if not github_api.create_or_update_github_file(
@@ -116,26 +221,48 @@ def create_new_project(user_project_name: str) -> tuple[str | None, str | None,
         commit_message="Initial commit: Add README.md",
         content=readme_content
     ):
-        print(f"❌ Failed to push initial commit to '{GITHUB_DEFAULT_BRANCH_NAME}' branch in '{project_repo_name}'. Aborting project creation.")
+        logger.error("❌ Failed to push initial commit to '%s' branch in '%s'. Aborting project creation.", GITHUB_DEFAULT_BRANCH_NAME, project_repo_name)
         # Considerar cleanup: borrar repo de github si falla el commit inicial
-        return None, None, None, None
-    print(f"✅ Initial commit pushed to '{GITHUB_DEFAULT_BRANCH_NAME}' branch in '{project_repo_name}'.")
-
+        return False
+    logger.info("✅ Initial commit pushed to '%s' branch in '%s'.", GITHUB_DEFAULT_BRANCH_NAME, project_repo_name)
 
-    # 3. Crear la rama de desarrollo (develop) en GitHub
-    dev_git_branch_name = GITHUB_DEV_BRANCH_NAME # Esta es la rama 'develop'
     if not github_api.create_github_branch(
         repo_name=project_repo_name,
         branch_name=dev_git_branch_name,
         base_branch=GITHUB_DEFAULT_BRANCH_NAME # Ahora 'main' tiene un commit y esto debería funcionar
     ):
-        print(f"❌ Failed to create '{dev_git_branch_name}' branch in GitHub repository '{project_repo_name}'. Aborting project creation.")
+        logger.error("❌ Failed to create '%s' branch in GitHub repository '%s'. Aborting project creation.", dev_git_branch_name, project_repo_name)
         # Considerar cleanup: borrar repo de github si no se creó la rama
+        return False
+    logger.info("✅ GitHub branch '%s' created in '%s'.", dev_git_branch_name, project_repo_name)
+    return True
+
+def create_new_project(user_project_name: str) -> tuple[str | None, str | None, str | None, str | None]:
+    logger.info("Attempting to create new project with display name: '%s'...", user_project_name)
+    existing_project_id = _check_project_display_name_exists(user_project_name)
+    if existing_project_id:
+        logger.error("❌ Error: Project with display name '%s' already exists (ID: '%s').", user_project_name, existing_project_id)
         return None, None, None, None
-    print(f"✅ GitHub branch '{dev_git_branch_name}' created in '{project_repo_name}'.")
 
+    project_id = _generate_project_id()
+    default_env = DEFAULT_PROJECT_ENVIRONMENT
+    namespace_name = _get_physical_namespace_name(project_id, default_env)
 
-    # 4. Crear el namespace de Kubernetes
+    project_repo_name = _get_project_github_repo_name(user_project_name)
+    project_repo_url = None
+
+    # 1. Crear el repositorio de GitHub
+    logger.info("ℹ️ Creating GitHub repository '%s' for project '%s'...", project_repo_name, user_project_name)
+    project_repo_url = github_api.create_github_repository(
+        repo_name=project_repo_name,
+        description=f"KubeSol project '{user_project_name}' (ID: {project_id})"
+    )
+    if not project_repo_url:
+        logger.error("❌ Failed to create GitHub repository '%s'. Aborting project creation.", project_repo_name)
+        return None, None, None, None
+
+    # 2. Crear el namespace de Kubernetes en segundo plano: solo depende de la URL del repo,
+    #    así que se solapa con el commit inicial y la rama develop en GitHub.
     labels = {
         PROJECT_ID_LABEL_KEY: project_id,
         PROJECT_NAME_LABEL_KEY: user_project_name,
@@ -145,83 +272,94 @@ def create_new_project(user_project_name: str) -> tuple[str | None, str | None,
     annotations = { # <--- NUEVO: Las URLs como ANOTACIONES
         PROJECT_REPO_URL_ANNOTATION_KEY: project_repo_url #
     }
+    dev_git_branch_name = GITHUB_DEV_BRANCH_NAME # Esta es la rama 'develop'
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        namespace_future = pool.submit(k8s_api.create_k8s_namespace, name=namespace_name, labels=labels, annotations=annotations)
+        github_ok = _initialize_project_repository(project_repo_name, user_project_name, dev_git_branch_name)
+        namespace_ok = namespace_future.result()
+
+    if not github_ok:
+        # Rollback: sin repo inicializado el proyecto no es usable; se retira el namespace si llegó a crearse
+        if namespace_ok:
+            logger.info("ℹ️ Removing namespace '%s' created for the aborted project.", namespace_name)
+            k8s_api.delete_k8s_namespace(namespace_name)
+        return None, None, None, None
 
-    if k8s_api.create_k8s_namespace(name=namespace_name, labels=labels, annotations=annotations): # <--- Pasar annotations
-        print(f"✅ Project '{user_project_name}' (ID: {project_id}) created.")
-        print(f"   Default environment '{default_env}' (Namespace: '{namespace_name}') created and labeled.")
-        print(f"   GitHub repository: {project_repo_url} (Branches: {GITHUB_DEFAULT_BRANCH_NAME}, {dev_git_branch_name})")
+    if namespace_ok:
+        invalidate_project_id_cache()
+        logger.info("✅ Project '%s' (ID: %s) created.", user_project_name, project_id)
+        logger.info("   Default environment '%s' (Namespace: '%s') created and labeled.", default_env, namespace_name)
+        logger.info("   GitHub repository: %s (Branches: %s, %s)", project_repo_url, GITHUB_DEFAULT_BRANCH_NAME, dev_git_branch_name)
         return project_id, default_env, namespace_name, user_project_name
     
-    print(f"❌ Failed to create default namespace '{namespace_name}' for project '{user_project_name}'. Aborting.")
+    logger.error("❌ Failed to create default namespace '%s' for project '%s'. Aborting.", namespace_name, user_project_name)
     # Considerar cleanup: borrar repo y ramas de github si no se creó el namespace
     return None, None, None, None
 
 
 def add_environment_to_project(project_id: str, user_project_name: str, new_env_name: str, depends_on_env_name: str | None = None) -> str | None:
     depends_msg = f" depending on '{depends_on_env_name}'" if depends_on_env_name else ""
-    print(f"Attempting to add environment '{new_env_name}'{depends_msg} to project '{user_project_name}' (ID: {project_id})...")
+    logger.info("Attempting to add environment '%s'%s to project '%s' (ID: %s)...", new_env_name, depends_msg, user_project_name, project_id)
     if not project_id or not user_project_name:
-        print("❌ Internal Error: Project ID or Project Name not provided to add_environment_to_project.")
+        logger.error("❌ Internal Error: Project ID or Project Name not provided to add_environment_to_project.")
         return None
 
     namespace_name = _get_physical_namespace_name(project_id, new_env_name)
-    existing_ns = k8s_api.get_k8s_namespace(namespace_name)
+    existing_ns = _get_environment_namespace(project_id, new_env_name)
     if existing_ns:
-        print(f"ℹ️ Environment '{new_env_name}' (Namespace: '{namespace_name}') already exists for project '{user_project_name}'.")
-        return namespace_name
+        logger.info("ℹ️ Environment '%s' (Namespace: '%s') already exists for project '%s'.", new_env_name, existing_ns.metadata.name, user_project_name)
+        return existing_ns.metadata.name
 
     project_repo_name = None
     project_repo_url = None
 
-    project_namespaces = k8s_api.list_k8s_namespaces(label_selector=f"{PROJECT_ID_LABEL_KEY}={project_id}")
-    if project_namespaces:
-        first_ns_labels = project_namespaces[0].metadata.labels
-        first_ns_annotations = project_namespaces[0].metadata.annotations # Obtener anotaciones
+    # El repo se lee del namespace del entorno por defecto, cuyo nombre se conoce: un GET en vez de un LIST.
+    # Si ese entorno ya no existe, se recurre a cualquier namespace del proyecto.
+    repo_source_ns = k8s_api.get_k8s_namespace(_get_physical_namespace_name(project_id, DEFAULT_PROJECT_ENVIRONMENT))
+    if not repo_source_ns:
+        project_namespaces = k8s_api.list_namespace_metadata(label_selector=_PROJECT_ID_SELECTOR_PREFIX + project_id)
+        repo_source_ns = project_namespaces[0] if project_namespaces else None
+    if repo_source_ns:
+        first_ns_labels = repo_source_ns.metadata.labels or _EMPTY_LABELS
+        first_ns_annotations = repo_source_ns.metadata.annotations or _EMPTY_LABELS # Obtener anotaciones
         project_repo_name = first_ns_labels.get(PROJECT_REPO_NAME_LABEL_KEY)
         project_repo_url = first_ns_annotations.get(PROJECT_REPO_URL_ANNOTATION_KEY) # <--- Leer de ANOTACION
         
     if not project_repo_name or not project_repo_url: # project_repo_url también es necesario
-        print(f"❌ Error: Could not determine GitHub repository name or URL for project '{user_project_name}' (ID: {project_id}). "
-              "Please ensure the project's namespaces are correctly labeled/annotated.")
+        logger.error("❌ Error: Could not determine GitHub repository name or URL for project '%s' (ID: %s). Please ensure the project's namespaces are correctly labeled/annotated.", user_project_name, project_id)
         return None
 
     # Validación: Si se especifica depends_on_env_name, verificar que existe
     base_git_branch_name = GITHUB_DEFAULT_BRANCH_NAME
     if depends_on_env_name:
         # Verificar que el ambiente del cual depende existe
-        depends_on_namespace = _get_physical_namespace_name(project_id, depends_on_env_name)
-        depends_on_ns = k8s_api.get_k8s_namespace(depends_on_namespace)
+        depends_on_ns = _get_environment_namespace(project_id, depends_on_env_name)
         if not depends_on_ns:
-            print(f"❌ Error: Environment '{depends_on_env_name}' does not exist in project '{user_project_name}'. Cannot create environment that depends on non-existent environment.")
+            logger.error("❌ Error: Environment '%s' does not exist in project '%s'. Cannot create environment that depends on non-existent environment.", depends_on_env_name, user_project_name)
             return None
         
         # Verificar que las etiquetas coinciden con el proyecto
-        depends_on_labels = depends_on_ns.metadata.labels
-        if not (depends_on_labels and 
-                depends_on_labels.get(PROJECT_ID_LABEL_KEY) == project_id and 
+        depends_on_labels = depends_on_ns.metadata.labels or _EMPTY_LABELS
+        if not (depends_on_labels.get(PROJECT_ID_LABEL_KEY) == project_id and 
                 depends_on_labels.get(ENVIRONMENT_LABEL_KEY) == depends_on_env_name):
-            print(f"❌ Error: Environment '{depends_on_env_name}' namespace labels don't match project '{user_project_name}' (ID: {project_id}).")
+            logger.error("❌ Error: Environment '%s' namespace labels don't match project '%s' (ID: %s).", depends_on_env_name, user_project_name, project_id)
             return None
         
         base_git_branch_name = _get_github_branch_name_for_env(depends_on_env_name)
-        print(f"ℹ️ Environment '{new_env_name}' will depend on '{depends_on_env_name}'. Using branch '{base_git_branch_name}' as base.")
+        logger.info("ℹ️ Environment '%s' will depend on '%s'. Using branch '%s' as base.", new_env_name, depends_on_env_name, base_git_branch_name)
 
     new_env_git_branch_name = _get_github_branch_name_for_env(new_env_name)
 
-    # Crear la rama de GitHub basada en la dependencia o rama por defecto
-    if depends_on_env_name:
-        print(f"ℹ️ Creating GitHub branch '{new_env_git_branch_name}' based on environment '{depends_on_env_name}' (Git branch: '{base_git_branch_name}')...")
-    else:
-        print(f"ℹ️ No dependency specified. Creating GitHub branch '{new_env_git_branch_name}' from default branch '{GITHUB_DEFAULT_BRANCH_NAME}'...")
-    
+    # Crear la rama de GitHub basada en la dependencia o rama por defecto (ya resuelta arriba)
+    logger.info("ℹ️ Creating GitHub branch '%s' from '%s'...", new_env_git_branch_name, base_git_branch_name)
     if not github_api.create_github_branch(
         repo_name=project_repo_name,
         branch_name=new_env_git_branch_name,
         base_branch=base_git_branch_name
     ):
-        print(f"❌ Failed to create GitHub branch '{new_env_git_branch_name}' from '{base_git_branch_name}'. Aborting environment creation.")
+        logger.error("❌ Failed to create GitHub branch '%s' from '%s'. Aborting environment creation.", new_env_git_branch_name, base_git_branch_name)
         return None
-    print(f"✅ GitHub branch '{new_env_git_branch_name}' created in '{project_repo_name}'.")
+    logger.info("✅ GitHub branch '%s' created in '%s'.", new_env_git_branch_name, project_repo_name)
 
     labels = {
         PROJECT_ID_LABEL_KEY: project_id,
@@ -239,11 +377,11 @@ def add_environment_to_project(project_id: str, user_project_name: str, new_env_
 
     if k8s_api.create_k8s_namespace(name=namespace_name, labels=labels, annotations=annotations): # <--- Pasar annotations
         dependency_info = f" (depends on '{depends_on_env_name}')" if depends_on_env_name else ""
-        print(f"✅ Environment '{new_env_name}'{dependency_info} created for project '{user_project_name}' (Namespace: '{namespace_name}').")
-        print(f"   Associated GitHub branch: {new_env_git_branch_name}")
+        logger.info("✅ Environment '%s'%s created for project '%s' (Namespace: '%s').", new_env_name, dependency_info, user_project_name, namespace_name)
+        logger.info("   Associated GitHub branch: %s", new_env_git_branch_name)
         return namespace_name
     
-    print(f"❌ Failed to create namespace '{namespace_name}' for environment '{new_env_name}'. Aborting.")
+    logger.error("❌ Failed to create namespace '%s' for environment '%s'. Aborting.", namespace_name, new_env_name)
     return None
 
 def update_project_display_name_label(old_display_name: str, new_display_name: str) -> bool:
@@ -254,164 +392,194 @@ def update_project_display_name_label(old_display_name: str, new_display_name: s
     # Si quisieras renombrar el repo de GitHub, sería una operación separada y compleja en la API de GitHub.
     # ... (resto de la función)
     if old_display_name == new_display_name:
-        print(f"ℹ️ New display name ('{new_display_name}') is the same as the old one ('{old_display_name}'). No update performed.")
+        logger.info("ℹ️ New display name ('%s') is the same as the old one ('%s'). No update performed.", new_display_name, old_display_name)
         return True # No change needed, considered a success.
 
-    print(f"Attempting to update project display name from '{old_display_name}' to '{new_display_name}'...")
+    logger.info("Attempting to update project display name from '%s' to '%s'...", old_display_name, new_display_name)
 
-    project_id_to_update = _resolve_project_id_from_display_name(old_display_name)
-    if not project_id_to_update:
+    # Un solo listado resuelve el ID antiguo, comprueba el nombre nuevo y da los namespaces a actualizar.
+    # Lectura fresca (sin caché): otro cliente puede haber usado el nombre o creado entornos hace segundos
+    name_to_ids, id_to_namespaces = _load_project_index(use_cache=False)
+    try:
+        project_id_to_update = _pick_unique_project_id(old_display_name, name_to_ids.get(old_display_name, set()))
+    except _ProjectNotResolved:
         return False
 
-    new_name_existing_project_id = _check_project_display_name_exists(new_display_name)
-    if new_name_existing_project_id and new_name_existing_project_id != project_id_to_update:
-        print(f"❌ Cannot update display name to '{new_display_name}': this name is already in use by project ID '{new_name_existing_project_id}'.")
-        print(f"   KubeSol project display names must be unique.")
+    other_ids_with_new_name = name_to_ids.get(new_display_name, set()) - {project_id_to_update}
+    if other_ids_with_new_name:
+        logger.error("❌ Cannot update display name to '%s': this name is already in use by project ID '%s'.\n   KubeSol project display names must be unique.", new_display_name, next(iter(other_ids_with_new_name)))
         return False
 
-    label_selector_for_id = f"{PROJECT_ID_LABEL_KEY}={project_id_to_update}"
-    namespaces_to_update = k8s_api.list_k8s_namespaces(label_selector=label_selector_for_id)
+    namespaces_to_update = id_to_namespaces.get(project_id_to_update, [])
     
     if not namespaces_to_update:
-        print(f"ℹ️ No namespaces found for project ID '{project_id_to_update}' (originally display name '{old_display_name}').")
+        logger.info("ℹ️ No namespaces found for project ID '%s' (originally display name '%s').", project_id_to_update, old_display_name)
         return True
 
-    updated_ns_count = 0
+    invalidate_project_id_cache() # Las etiquetas de nombre cambian a partir de aquí, aunque falle a medias
     total_ns_to_update = len(namespaces_to_update)
-    print(f"Found {total_ns_to_update} environment(s) for project ID '{project_id_to_update}'. Attempting to update their display name label...")
-
-    for ns_obj in namespaces_to_update:
-        ns_name = ns_obj.metadata.name
-        # También actualiza el PROJECT_REPO_NAME_LABEL_KEY si el nombre del repositorio depende del display_name
-        # Pero el nombre del repo se basa en el nombre del proyecto original, no cambia con el display name.
-        # Solo actualizamos el label PROJECT_NAME_LABEL_KEY
-        if k8s_api.update_k8s_namespace_labels(ns_name, {PROJECT_NAME_LABEL_KEY: new_display_name}):
-            updated_ns_count += 1
-        else:
-            print(f"⚠️ Failed to update label for namespace '{ns_name}'.")
-            
+    logger.info("Found %s environment(s) for project ID '%s'. Attempting to update their display name label...", total_ns_to_update, project_id_to_update)
+
+    # El nombre del repo se basa en el nombre del proyecto original, no cambia con el display name.
+    # Solo actualizamos el label PROJECT_NAME_LABEL_KEY; k8s_api lanza todos los PATCH a la vez.
+    new_labels = {PROJECT_NAME_LABEL_KEY: new_display_name}
+    failed_names = k8s_api.bulk_update_namespace_labels([(ns_obj.metadata.name, new_labels) for ns_obj in namespaces_to_update])
+    for ns_name in failed_names:
+        logger.warning("⚠️ Failed to update label for namespace '%s'.", ns_name)
+    updated_ns_count = total_ns_to_update - len(failed_names)
+
     if updated_ns_count == total_ns_to_update:
-        print(f"✅ Successfully updated project display name to '{new_display_name}' for all {updated_ns_count} namespace(s) of project ID '{project_id_to_update}'.")
+        logger.info("✅ Successfully updated project display name to '%s' for all %s namespace(s) of project ID '%s'.", new_display_name, updated_ns_count, project_id_to_update)
         return True
     elif updated_ns_count > 0:
-        print(f"⚠️ Partially updated project display name. Only {updated_ns_count} out of {total_ns_to_update} namespaces were updated for project ID '{project_id_to_update}'.")
+        logger.warning("⚠️ Partially updated project display name. Only %s out of %s namespaces were updated for project ID '%s'.", updated_ns_count, total_ns_to_update, project_id_to_update)
         return False
     else:
-        print(f"❌ No namespace display name labels were successfully updated for project ID '{project_id_to_update}'.")
+        logger.error("❌ No namespace display name labels were successfully updated for project ID '%s'.", project_id_to_update)
         return False
 
-def get_all_project_details() -> list[dict]:
-    """Retrieves details of all KubeSol projects, including environment names."""
-    namespaces = k8s_api.list_k8s_namespaces(label_selector=PROJECT_ID_LABEL_KEY)
-    projects_data = {} # Key: project_id, Value: {"display_names": set(), "environments": set()}
-    
-    if namespaces:
-        for ns_obj in namespaces:
-            labels = ns_obj.metadata.labels
-            if labels:
-                proj_id = labels.get(PROJECT_ID_LABEL_KEY)
-                proj_name_label = labels.get(PROJECT_NAME_LABEL_KEY)
-                env_name_label = labels.get(ENVIRONMENT_LABEL_KEY)
-                if proj_id: 
-                    if proj_id not in projects_data:
-                        projects_data[proj_id] = {"display_names": set(), "environments": set()}
-                    if proj_name_label:
-                         projects_data[proj_id]["display_names"].add(proj_name_label)
-                    if env_name_label:
-                        projects_data[proj_id]["environments"].add(env_name_label) # Almacenar nombres de entorno
-    
-    output_list = []
-    for proj_id, data in projects_data.items():
-        display_name_str = ", ".join(sorted(list(data["display_names"]))) if data["display_names"] else "[No Display Name Label]"
-        if len(data["display_names"]) > 1: display_name_str += " (Warning: Inconsistent display names for this ID)"
-        
-        # MODIFICADO: Añadir lista de nombres de entornos
-        environment_names_list = sorted(list(data["environments"]))
-        
-        output_list.append({
-            "project_id": proj_id, 
-            "project_display_name": display_name_str,
-            "environment_count": len(environment_names_list),
-            "environment_names": environment_names_list # NUEVA CLAVE
-        })
-            
-    return sorted(output_list, key=lambda x: x["project_display_name"])
-
-def get_environments_for_project(user_project_name: str) -> list[dict] | None:
+def _unique_sorted(values: list) -> list:
+    # Casi siempre hay 0 o 1 valor distinto: sólo se deduplica cuando hace falta
+    return sorted(set(values)) if len(values) > 1 else values
+
+def _format_project_display_names(display_names: list) -> str:
+    if not display_names: return "[No Display Name Label]"
+    display_name_str = ", ".join(display_names)
+    if len(display_names) > 1: display_name_str += " (Warning: Inconsistent display names for this ID)"
+    return display_name_str
+
+def iter_project_details() -> Iterator[dict]:
+    """Yields the details of each KubeSol project (unsorted), including environment names."""
+    namespaces = k8s_api.list_namespace_metadata(label_selector=_ALL_PROJECTS_SELECTOR, from_watch_cache=True)
+    # Key: project_id, Value: (display_names, environments); se deduplican al emitir
+    projects_data: defaultdict[str, tuple[list, list]] = defaultdict(lambda: ([], []))
+
+    for ns_obj in namespaces:
+        labels = ns_obj.metadata.labels or _EMPTY_LABELS
+        proj_id = labels.get(PROJECT_ID_LABEL_KEY)
+        if not proj_id: continue
+        display_names, environments = projects_data[proj_id]
+        proj_name_label = labels.get(PROJECT_NAME_LABEL_KEY)
+        if proj_name_label: display_names.append(proj_name_label)
+        env_name_label = labels.get(ENVIRONMENT_LABEL_KEY)
+        if env_name_label: environments.append(env_name_label) # Almacenar nombres de entorno
+
+    for proj_id, (display_names, environments) in projects_data.items():
+        environments = _unique_sorted(environments)
+        yield {
+            "project_id": proj_id,
+            "project_display_name": _format_project_display_names(_unique_sorted(display_names)),
+            "environment_count": len(environments),
+            "environment_names": environments,
+        }
+
+def get_all_project_details(limit: int | None = None) -> list[dict]:
+    """
+    Retrieves details of all KubeSol projects sorted by display name.
+    With a limit, only the first `limit` projects are returned, selected without sorting the rest.
+    """
+    by_display_name = itemgetter("project_display_name")
+    if limit is None:
+        return sorted(iter_project_details(), key=by_display_name)
+    return heapq.nsmallest(limit, iter_project_details(), key=by_display_name)
+
+def get_environments_for_project(user_project_name: str, fields: frozenset[str] | None = None) -> list[dict] | None:
+    """
+    Environments of a project sorted by name. `fields` limits the optional columns
+    ("status", "created") that are computed; None includes all of them.
+    """
     # user_project_name ya viene en minúsculas
     # ... (lógica como antes, ya debería funcionar con nombres en minúsculas para la búsqueda por etiquetas) ...
-    project_id = _resolve_project_id_from_display_name(user_project_name)
-    if not project_id: return None 
-    label_selector_for_id = f"{PROJECT_ID_LABEL_KEY}={project_id}"
-    namespaces = k8s_api.list_k8s_namespaces(label_selector=label_selector_for_id)
+    # Todos los entornos de un proyecto llevan su etiqueta de display name (el rename las actualiza todas),
+    # así que un único listado por nombre resuelve el ID y trae los namespaces con su status
+    namespaces = k8s_api.list_k8s_namespaces(label_selector=_PROJECT_NAME_SELECTOR_PREFIX + user_project_name,
+                                             from_watch_cache=True)
+    try:
+        project_id = _pick_unique_project_id(user_project_name, _project_ids_in(namespaces))
+    except _ProjectNotResolved:
+        return None
     environments_info = []
     # ... (el resto de la función como estaba, ya que obtiene los valores de las etiquetas, que ahora serán minúsculas) ...
+    with_status = fields is None or "status" in fields
+    with_created = fields is None or "created" in fields
     if namespaces:
         for ns_obj in namespaces:
-            labels = ns_obj.metadata.labels
-            if labels:
-                env_name = labels.get(ENVIRONMENT_LABEL_KEY)
-                actual_display_name = labels.get(PROJECT_NAME_LABEL_KEY, user_project_name) 
-                if env_name:
-                    environments_info.append({
-                        "environment": env_name, "namespace": ns_obj.metadata.name,
-                        "project_id": project_id, "project_display_name": actual_display_name,
-                        "status": ns_obj.status.phase if ns_obj.status else "N/A",
-                        "created": ns_obj.metadata.creation_timestamp.isoformat() if ns_obj.metadata.creation_timestamp else "N/A" })
-    if not environments_info: print(f"ℹ️ No environments found for project '{user_project_name}' (ID: {project_id})."); return None
-    return sorted(environments_info, key=lambda x: x["environment"])
+            labels = ns_obj.metadata.labels or _EMPTY_LABELS
+            env_name = labels.get(ENVIRONMENT_LABEL_KEY)
+            if env_name:
+                env_info = {
+                    "environment": env_name, "namespace": ns_obj.metadata.name,
+                    "project_id": project_id, "project_display_name": labels.get(PROJECT_NAME_LABEL_KEY, user_project_name) }
+                if with_status:
+                    env_info["status"] = ns_obj.status.phase if ns_obj.status else "N/A"
+                if with_created:
+                    env_info["created"] = ns_obj.metadata.creation_timestamp.isoformat() if ns_obj.metadata.creation_timestamp else "N/A"
+                environments_info.append(env_info)
+    if not environments_info: logger.info("ℹ️ No environments found for project '%s' (ID: %s).", user_project_name, project_id); return None
+    return sorted(environments_info, key=itemgetter("environment"))
+
+def _read_deletion_confirmation(prompt: str) -> str | None:
+    """Asks for a deletion confirmation; None when stdin is not a terminal (scripts must pass force_delete)."""
+    if not sys.stdin.isatty():
+        logger.error("❌ Deletion needs confirmation, but input is not interactive. Nothing was deleted.")
+        return None
+    return input(prompt)
 
 def delete_whole_project(user_project_name: str, force_delete: bool = False) -> bool:
     project_id = _resolve_project_id_from_display_name(user_project_name)
     if not project_id: return False
 
-    label_selector_for_id = f"{PROJECT_ID_LABEL_KEY}={project_id}"
-    namespaces_to_delete = k8s_api.list_k8s_namespaces(label_selector=label_selector_for_id)
+    label_selector_for_id = _PROJECT_ID_SELECTOR_PREFIX + project_id
+    # Lectura fresca y consistente: un listado cacheado podría omitir entornos creados por otro cliente
+    namespaces_to_delete = k8s_api.list_namespace_metadata(label_selector=label_selector_for_id, use_cache=False)
     
     project_repo_name = None
     project_repo_url = None
     if namespaces_to_delete:
-        first_ns_labels = namespaces_to_delete[0].metadata.labels
+        first_ns_labels = namespaces_to_delete[0].metadata.labels or _EMPTY_LABELS
         project_repo_name = first_ns_labels.get(PROJECT_REPO_NAME_LABEL_KEY)
         
         first_ns_annotations = namespaces_to_delete[0].metadata.annotations # NUEVO
         project_repo_url = first_ns_annotations.get(PROJECT_REPO_URL_ANNOTATION_KEY) # NUEVO
 
     if not namespaces_to_delete:
-        print(f"ℹ️ No environments for project '{user_project_name}' (ID: {project_id}). Nothing to delete."); return True
+        logger.info("ℹ️ No environments for project '%s' (ID: %s). Nothing to delete.", user_project_name, project_id); return True
     
-    print(f"🚨 Project '{user_project_name}' (ID: {project_id}) environments to be DELETED:");
-    for ns in namespaces_to_delete: print(f"  - NS: {ns.metadata.name} (Env: {ns.metadata.labels.get(ENVIRONMENT_LABEL_KEY, 'N/A')})")
+    logger.info("🚨 Project '%s' (ID: %s) environments to be DELETED:", user_project_name, project_id);
+    if logger.isEnabledFor(logging.INFO): # La lista se arma solo si se va a mostrar, y sale como un único registro
+        logger.info("\n".join(f"  - NS: {ns.metadata.name} (Env: {(ns.metadata.labels or _EMPTY_LABELS).get(ENVIRONMENT_LABEL_KEY, 'N/A')})"
+                               for ns in namespaces_to_delete))
     if project_repo_name:
         repo_link = f" ({project_repo_url})" if project_repo_url else ""
-        print(f"   Associated GitHub repository: '{project_repo_name}'{repo_link} WILL NOT BE DELETED AUTOMATICALLY.")
-        print("   Please delete the GitHub repository manually if desired.")
+        logger.info("   Associated GitHub repository: '%s'%s WILL NOT BE DELETED AUTOMATICALLY.", project_repo_name, repo_link)
+        logger.info("   Please delete the GitHub repository manually if desired.")
 
     if not force_delete:
-        confirm = input(f"CONFIRM DELETION of ALL listed namespaces for project '{user_project_name}' by typing project name: ")
-        if confirm != user_project_name: print("Deletion cancelled."); return False
-
-    deleted_count, failed_names = 0, []
-    for ns in namespaces_to_delete:
-        if k8s_api.delete_k8s_namespace(ns.metadata.name): deleted_count += 1
-        else: failed_names.append(ns.metadata.name)
+        confirm = _read_deletion_confirmation(f"CONFIRM DELETION of ALL listed namespaces for project '{user_project_name}' by typing project name: ")
+        if confirm is None: return False
+        if confirm != user_project_name: logger.info("Deletion cancelled."); return False
+
+    invalidate_project_id_cache()
+    # Los borrados son independientes entre sí: k8s_api los lanza en paralelo
+    failed_names = k8s_api.bulk_delete_namespaces([ns.metadata.name for ns in namespaces_to_delete])
+    deleted_count = len(namespaces_to_delete) - len(failed_names)
     
-    if failed_names: print(f"❌ Finished. {deleted_count} env(s) deleted. Failed: {failed_names}"); return False
-    print(f"✅ Project '{user_project_name}' and its {deleted_count} environment(s) deleted."); return True
+    if failed_names: logger.error("❌ Finished. %s env(s) deleted. Failed: %s", deleted_count, failed_names); return False
+    logger.info("✅ Project '%s' and its %s environment(s) deleted.", user_project_name, deleted_count); return True
 
 
 
 def delete_project_environment(project_id: str, user_project_name_for_msg: str, env_name: str, force_delete: bool = False) -> bool:
-    namespace_name = _get_physical_namespace_name(project_id, env_name)
-    ns_obj = k8s_api.get_k8s_namespace(namespace_name)
+    ns_obj = _get_environment_namespace(project_id, env_name)
     
     if not ns_obj:
-        print(f"❌ NS '{namespace_name}' for env '{env_name}' of project '{user_project_name_for_msg}' not found."); return False
+        logger.error("❌ NS '%s' for env '%s' of project '%s' not found.", _get_physical_namespace_name(project_id, env_name), env_name, user_project_name_for_msg); return False
+    namespace_name = ns_obj.metadata.name
     
-    labels = ns_obj.metadata.labels
+    labels = ns_obj.metadata.labels or _EMPTY_LABELS
     annotations = ns_obj.metadata.annotations # NUEVO: Obtener anotaciones
-    if not (labels and labels.get(PROJECT_ID_LABEL_KEY) == project_id and labels.get(ENVIRONMENT_LABEL_KEY) == env_name):
-        print(f"❌ Safety check: NS '{namespace_name}' labels don't match project ID '{project_id}' / env '{env_name}'. Labels: {labels}. Aborting."); return False
+    if not (labels.get(PROJECT_ID_LABEL_KEY) == project_id and labels.get(ENVIRONMENT_LABEL_KEY) == env_name):
+        logger.error("❌ Safety check: NS '%s' labels don't match project ID '%s' / env '%s'. Labels: %s. Aborting.", namespace_name, project_id, env_name, ns_obj.metadata.labels); return False
 
     project_repo_name = labels.get(PROJECT_REPO_NAME_LABEL_KEY)
     project_repo_url = annotations.get(PROJECT_REPO_URL_ANNOTATION_KEY) # NUEVO: Obtener URL de anotación
@@ -423,19 +591,25 @@ def delete_project_environment(project_id: str, user_project_name_for_msg: str,
             repo_link = f" ({project_repo_url})" if project_repo_url else ""
             confirm_msg += f"\n   Associated GitHub branch '{env_git_branch_name}' in repo '{project_repo_name}'{repo_link} WILL NOT BE DELETED AUTOMATICALLY."
             confirm_msg += "\n   Please delete the GitHub branch manually if desired."
-        confirm = input(f"{confirm_msg}\nType 'yes': ")
-        if confirm.lower() != 'yes': print("Deletion cancelled."); return False
-
-    if k8s_api.delete_k8s_namespace(namespace_name):
-        print(f"✅ Env '{env_name}' (NS '{namespace_name}') deleted."); return True
+        confirm = _read_deletion_confirmation(f"{confirm_msg}\nType 'yes': ")
+        if confirm is None: return False
+        if confirm.lower() != 'yes': logger.info("Deletion cancelled."); return False
+
+    # La precondición de UID garantiza que se borra el mismo namespace que pasó el chequeo y la confirmación
+    if k8s_api.delete_k8s_namespace(namespace_name, uid=ns_obj.metadata.uid):
+        invalidate_project_id_cache() # Si era el último entorno, el proyecto deja de existir
+        logger.info("✅ Env '%s' (NS '%s') deleted.", env_name, namespace_name); return True
     return False
 
-def resolve_project_and_environment_namespaces(user_project_name: str, environment_name: str) -> tuple[str | None, str | None, str | None, str | None]:
-    project_id = _resolve_project_id_from_display_name(user_project_name)
-    if not project_id: return None, None, None, f"Project '{user_project_name}' not found or ambiguous."
-    physical_namespace = _get_physical_namespace_name(project_id, environment_name)
-    ns_obj = k8s_api.get_k8s_namespace(physical_namespace)
-    if not ns_obj: return project_id, user_project_name, None, f"Env '{environment_name}' (NS '{physical_namespace}') not found for project '{user_project_name}' (ID: {project_id})."
+def resolve_project_and_environment_namespaces(user_project_name: str, environment_name: str, *,
+                                               project_id: str | None = None) -> tuple[str | None, str | None, str | None, str | None]:
+    """Pass project_id when the caller already knows it (e.g. the active context) to skip the name resolution."""
+    if not project_id:
+        project_id = _resolve_project_id_from_display_name(user_project_name)
+        if not project_id: return None, None, None, f"Project '{user_project_name}' not found or ambiguous."
+    ns_obj = _get_environment_namespace(project_id, environment_name)
+    if not ns_obj: return project_id, user_project_name, None, f"Env '{environment_name}' (NS '{_get_physical_namespace_name(project_id, environment_name)}') not found for project '{user_project_name}' (ID: {project_id})."
+    physical_namespace = ns_obj.metadata.name
     # Consistency check for labels (optional, for stricter validation)
     # ...
     return project_id, user_project_name, physical_namespace, None
\ No newline at end of file
@@ -1,9 +1,13 @@
 # mi_script_local.py
 import argparse
 
-parser = argparse.ArgumentParser(description='Un script de prueba leído desde un archivo.')
-parser.add_argument('--mensaje', type=str, required=True, help='Mensaje a imprimir.')
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Un script de prueba leído desde un archivo.')
+    parser.add_argument('--mensaje', type=str, required=True, help='Mensaje a imprimir.')
 
-args = parser.parse_args()
-print(f"Script ejecutado desde archivo! Mensaje: {args.mensaje}")
-print("¡Funciona!")
\ No newline at end of file
+    args = parser.parse_args(argv)
+    print(f"Script ejecutado desde archivo! Mensaje: {args.mensaje}")
+    print("¡Funciona!")
+
+if __name__ == "__main__":
+    main()
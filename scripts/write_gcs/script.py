@@ -1,10 +1,17 @@
 # gcs_parquet_writer.py
-import pyarrow as pa
-import pyarrow.parquet as pq
-import gcsfs
+import functools
 import os
-import uuid
 import argparse # For parsing command-line arguments
+# numpy/pyarrow are imported in main() after argument parsing, so --help and bad arguments fail fast
+
+# Upload buffer for the GCS output stream: larger chunks mean fewer upload requests
+GCS_UPLOAD_BLOCK_SIZE = 16 * 1024 * 1024
+
+@functools.lru_cache(maxsize=1)
+def get_gcs_filesystem():
+    """Process-wide pyarrow GcsFileSystem: credentials and connections are set up once and reused by every write."""
+    from pyarrow import fs as pafs
+    return pafs.GcsFileSystem(anonymous=False)
 
 def main():
     parser = argparse.ArgumentParser(description="PyArrow script to write Parquet to GCS.")
@@ -25,15 +32,47 @@ def main():
         default="output_from_kubesol",
         help="Subdirectory within the GCS bucket for the output."
     )
+    # Parquet write tuning
+    parser.add_argument(
+        "--compression",
+        default="zstd",
+        help="Parquet compression codec (e.g. zstd, snappy, lz4, gzip, none)."
+    )
+    parser.add_argument(
+        "--compression_level",
+        type=int,
+        default=1,
+        help="Codec level for codecs that support it (zstd, gzip, brotli)."
+    )
+    parser.add_argument(
+        "--row_group_size",
+        type=int,
+        default=None,
+        help="Maximum rows per Parquet row group (default: the whole table in one row group)."
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="After writing, check that the object exists on GCS (one extra metadata request)."
+    )
 
 
     args = parser.parse_args()
+
+    try:
+        import numpy as np
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        from pyarrow import fs as pafs
+    except ImportError as e:
+        print(f"❌ ERROR: Missing required Python package: {e}")
+        exit(1)
     print(f"Script arguments received: key_file_path='{args.gcs_key_file_path_arg}', bucket_name='{args.gcs_bucket_name_arg}', output_subdir='{args.output_sub_directory}'")
 
 
     # --- 1. Set up GCS Authentication using the provided argument ---
     # The path provided via --gcs_key_file_path_arg is used to set GOOGLE_APPLICATION_CREDENTIALS
-    # This environment variable is then used by gcsfs and google-cloud-storage
+    # This environment variable is then used by pyarrow's GcsFileSystem (default Google credentials)
     
     # Assign directly from args to the variable that will be checked by os.path.exists
     gcs_key_file_to_check = args.gcs_key_file_path_arg
@@ -46,37 +85,27 @@ def main():
     os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = gcs_key_file_to_check
     print(f"ℹ️ GOOGLE_APPLICATION_CREDENTIALS environment variable set to: {gcs_key_file_to_check}")
 
-    # Now, re-fetch it from env to confirm for the os.path.exists check and for clarity
-    # This is the variable that was None in your traceback
-    gcs_key_file_from_env = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
-
-    if not gcs_key_file_from_env:
-        print(f"❌ ERROR: GOOGLE_APPLICATION_CREDENTIALS could not be retrieved from environment after setting.")
-        print(f"   This indicates an issue with how the environment variable was set or fetched.")
-        exit(1)
-
-    # Line 23 (approximately) in your script that failed:
-    if not os.path.exists(gcs_key_file_from_env):
-        print(f"❌ ERROR: GCS key file not found at the specified path: {gcs_key_file_from_env}")
+    if not os.path.exists(gcs_key_file_to_check):
+        print(f"❌ ERROR: GCS key file not found at the specified path: {gcs_key_file_to_check}")
         print("   Please ensure the secret is correctly mounted in the pod at this path,")
         print("   and that this path was correctly passed as an argument to the script.")
         exit(1)
     
-    print(f"ℹ️ Verified GCS key file exists at: {gcs_key_file_from_env}")
+    print(f"ℹ️ Verified GCS key file exists at: {gcs_key_file_to_check}")
     
     gcs_bucket_name = args.gcs_bucket_name_arg # Use the bucket name from args
 
     # --- 2. Prepare Data (Example: Create a PyArrow Table) ---
     print("ℹ️ Preparing sample data using PyArrow...")
     try:
-        names = pa.array(["ArgUser1", "ArgUser2", "ArgUser3", "ArgUser4"], type=pa.string())
-        ids = pa.array([301, 302, 303, 304], type=pa.int32())
-        values = pa.array([float(i * 1.23) for i in range(4)], type=pa.float64())
-        
-        table_to_write = pa.Table.from_arrays(
-            [names, ids, values],
-            names=['user_name_arg', 'user_id_arg', 'value_arg']
-        )
+        user_names = ["ArgUser1", "ArgUser2", "ArgUser3", "ArgUser4"]
+        num_rows = len(user_names)
+        # Numeric columns are built as NumPy buffers, which Arrow adopts without a per-row Python loop
+        table_to_write = pa.Table.from_pydict({
+            'user_name_arg': pa.array(user_names, type=pa.string()),
+            'user_id_arg': pa.array(np.arange(301, 301 + num_rows, dtype=np.int32)),
+            'value_arg': pa.array(np.arange(num_rows, dtype=np.float64) * 1.23),
+        })
         print("ℹ️ Sample PyArrow Table created successfully:")
         print(table_to_write)
     except Exception as e:
@@ -84,30 +113,48 @@ def main():
         exit(1)
 
     # --- 3. Define GCS Output Path ---
-    unique_id = str(uuid.uuid4())[:8]
+    unique_id = os.urandom(4).hex()
     file_name = f"data_{unique_id}.parquet"
-    gcs_output_path = f"gs://{gcs_bucket_name}/{args.output_sub_directory}/{file_name}"
+    gcs_object_path = f"{gcs_bucket_name}/{args.output_sub_directory}/{file_name}" # pyarrow.fs paths have no gs:// scheme
+    gcs_output_path = f"gs://{gcs_object_path}"
     
     print(f"ℹ️ Target GCS path for Parquet file: {gcs_output_path}")
 
-    # --- 4. Initialize GCSFileSystem ---
+    # --- 4. Initialize GcsFileSystem (pyarrow's native C++ client) ---
     try:
-        fs = gcsfs.GCSFileSystem() 
-        print("ℹ️ GCSFileSystem initialized successfully.")
+        fs = get_gcs_filesystem()
+        print("ℹ️ GcsFileSystem initialized successfully.")
     except Exception as e:
-        print(f"❌ ERROR: Failed to initialize GCSFileSystem: {e}")
+        print(f"❌ ERROR: Failed to initialize GcsFileSystem: {e}")
         exit(1)
 
     # --- 5. Write the PyArrow Table to GCS as a Parquet file ---
     try:
         print(f"ℹ️ Attempting to write Parquet file to {gcs_output_path}...")
-        pq.write_table(table_to_write, gcs_output_path, filesystem=fs)
+        codec_supports_level = args.compression.lower() in ("zstd", "gzip", "brotli")
+        with fs.open_output_stream(gcs_object_path, compression=None, buffer_size=GCS_UPLOAD_BLOCK_SIZE) as gcs_output_file:
+            pq.write_table(
+                table_to_write, gcs_output_file,
+                compression=args.compression,
+                compression_level=args.compression_level if codec_supports_level else None,
+                # Per-column encodings: dictionary for the repeated names, delta for the
+                # sequential ids and byte-stream-split for the floats (compresses better than plain)
+                use_dictionary=["user_name_arg"],
+                column_encoding={"user_id_arg": "DELTA_BINARY_PACKED"},
+                use_byte_stream_split=["value_arg"],
+                write_statistics=True,
+                data_page_size=1 << 20,
+                row_group_size=args.row_group_size or max(table_to_write.num_rows, 1),
+                version="2.6",
+            )
         print(f"✅ Successfully wrote Parquet file to {gcs_output_path}")
 
-        if fs.exists(gcs_output_path):
-            print(f"ℹ️ File verification: {gcs_output_path} exists on GCS.")
-        else:
-            print(f"⚠️ File verification: {gcs_output_path} NOT found on GCS immediately after write.")
+        # A failed upload already raises when the stream is closed; checking again is opt-in
+        if args.verify:
+            if fs.get_file_info(gcs_object_path).type != pafs.FileType.NotFound:
+                print(f"ℹ️ File verification: {gcs_output_path} exists on GCS.")
+            else:
+                print(f"⚠️ File verification: {gcs_output_path} NOT found on GCS immediately after write.")
 
     except Exception as e:
         print(f"❌ ERROR: Failed to write Parquet file to GCS: {e}")